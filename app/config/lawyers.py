@@ -7,6 +7,8 @@ This file contains the list of lawyers who should receive lead notifications.
 
 from typing import List, Dict, Any
 
+from app.utils.phone import normalize_br_phone
+
 # Lawyer contact configuration
 LAWYERS = [
     {
@@ -45,14 +47,8 @@ def format_lawyer_phone_for_whatsapp(phone: str) -> str:
     Returns:
         str: Formatted phone number for WhatsApp
     """
-    # Clean phone number
-    clean_phone = ''.join(filter(str.isdigit, phone))
-    
-    # Ensure it starts with country code if not present
-    if not clean_phone.startswith("55"):
-        clean_phone = f"55{clean_phone}"
-    
-    return f"{clean_phone}@s.whatsapp.net"
+    # Clean phone number and ensure it starts with the country code
+    return f"{normalize_br_phone(phone)}@s.whatsapp.net"
 
 def create_lead_notification_message(lead_name: str, lead_phone: str, category: str) -> str:
     """
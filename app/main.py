@@ -5,6 +5,9 @@ from fastapi.exceptions import RequestValidationError
 import logging
 import os
 import asyncio
+import atexit
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
 
 # Import routes
@@ -14,18 +17,34 @@ from app.routes.conversation import router as conversation_router
 from app.routes.whatsapp import router as whatsapp_router
 from app.routes.leads import router as leads_router
 
+# Import middleware
+from app.middleware.webhook_verify import WebhookVerifyMiddleware
+from app.utils.log_context import CorrelationIdFilter
+
 # Import services for startup
 from app.services.firebase_service import initialize_firebase
-from app.services.baileys_service import baileys_service
+from app.services.baileys_service import get_baileys_service, get_baileys_status, cleanup_baileys_services
+from app.services.ai_chain import memory_janitor, warm_up_ai_orchestrator
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Configure logging
+# Configure logging (correlation_id vem do contexto da requisição)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - [%(correlation_id)s] %(message)s'
 )
+# A escrita dos logs roda em uma thread do QueueListener: o event loop só
+# enfileira o registro. O filtro fica no QueueHandler porque o correlation_id
+# precisa ser lido no contexto de quem loga, não na thread de escrita.
+_root_logger = logging.getLogger()
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, *_root_logger.handlers, respect_handler_level=True)
+_queue_handler = QueueHandler(_log_queue)
+_queue_handler.addFilter(CorrelationIdFilter())
+_root_logger.handlers = [_queue_handler]
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
 # Create FastAPI instance
@@ -38,11 +57,10 @@ app = FastAPI(
 # -------------------------
 # CORS Configuration - MUST COME BEFORE ALL ROUTERS
 # -------------------------
-# Define allowed origins
+# Origens explícitas: com allow_credentials=True o spec CORS não aceita "*"
 allowed_origins = [
     "https://projectlawyer.netlify.app",
     "https://68cdc61---projectlawyer.netlify.app",
-    "https://*.netlify.app",
     "https://law-firm-backend-936902782519.us-central1.run.app",
     "http://localhost:3000",
     "http://localhost:5173",
@@ -54,30 +72,15 @@ allowed_origins = [
     "http://127.0.0.1:8000",
 ]
 
-# Function to check if origin is allowed
-def is_origin_allowed(origin: str) -> bool:
-    """Check if origin is allowed, including wildcard patterns."""
-    if not origin:
-        return False
-    
-    # Direct match
-    if origin in allowed_origins:
-        return True
-    
-    # Check localhost patterns
-    if origin.startswith("http://localhost:") or origin.startswith("http://127.0.0.1:"):
-        return True
-    
-    # Check netlify patterns
-    if ".netlify.app" in origin and origin.startswith("https://"):
-        return True
-    
-    return False
-
-# Add CORS middleware with comprehensive configuration
+# Deploy previews do Netlify e qualquer porta local
+allowed_origin_regex = r"https://[\w.-]+\.netlify\.app|http://(localhost|127\.0\.0\.1):\d+"
+
+# CORSMiddleware puro ASGI: responde os preflights e injeta os cabeçalhos
+# uma única vez, sem cada rota precisar montar o próprio dict de headers
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins for now, we'll handle it manually
+    allow_origins=allowed_origins,
+    allow_origin_regex=allowed_origin_regex,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=[
@@ -99,79 +102,11 @@ app.add_middleware(
         "X-Request-ID",
         "Cache-Control"
     ],
-    max_age=3600,  # Cache preflight requests for 1 hour
+    max_age=86400,  # Cache preflight requests for 24 hours
 )
 
-# Add manual CORS headers for additional safety
-@app.middleware("http")
-async def add_cors_headers(request: Request, call_next):
-    """Add CORS headers manually for additional safety."""
-    # Handle preflight requests first
-    if request.method == "OPTIONS":
-        origin = request.headers.get("origin")
-        
-        headers = {
-            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS, PATCH",
-            "Access-Control-Allow-Headers": "Accept, Accept-Language, Content-Language, Content-Type, Authorization, X-Requested-With, X-Request-ID, X-HTTP-Method-Override, Cache-Control, Pragma, Expires",
-            "Access-Control-Expose-Headers": "Content-Type, Authorization, X-Request-ID, Cache-Control",
-            "Access-Control-Max-Age": "3600",
-            "Access-Control-Allow-Credentials": "true",
-            "Content-Length": "0"
-        }
-        
-        # Set appropriate origin
-        if is_origin_allowed(origin):
-            headers["Access-Control-Allow-Origin"] = origin
-        else:
-            headers["Access-Control-Allow-Origin"] = "*"
-        
-        from fastapi.responses import Response
-        return Response(status_code=200, headers=headers)
-    
-    # Process normal requests
-    response = await call_next(request)
-    
-    # Get origin from request
-    origin = request.headers.get("origin")
-    
-    # Set CORS headers based on origin
-    if is_origin_allowed(origin):
-        response.headers["Access-Control-Allow-Origin"] = origin
-    else:
-        # Allow all origins as fallback
-        response.headers["Access-Control-Allow-Origin"] = "*"
-    
-    response.headers["Access-Control-Allow-Credentials"] = "true"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
-    response.headers["Access-Control-Allow-Headers"] = "Accept, Accept-Language, Content-Language, Content-Type, Authorization, X-Requested-With, X-Request-ID, X-HTTP-Method-Override, Cache-Control, Pragma, Expires"
-    response.headers["Access-Control-Expose-Headers"] = "Content-Type, Authorization, X-Request-ID, Cache-Control"
-    response.headers["Access-Control-Max-Age"] = "3600"
-    
-    return response
-
-# Handle preflight OPTIONS requests globally
-@app.options("/{full_path:path}")
-async def options_handler(request: Request, full_path: str):
-    """Handle preflight OPTIONS requests for all routes."""
-    origin = request.headers.get("origin")
-    
-    # Set appropriate origin
-    if is_origin_allowed(origin):
-        allowed_origin = origin
-    else:
-        allowed_origin = "*"
-    
-    headers = {
-        "Access-Control-Allow-Origin": allowed_origin,
-        "Access-Control-Allow-Credentials": "true",
-        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS, PATCH",
-        "Access-Control-Allow-Headers": "Accept, Accept-Language, Content-Language, Content-Type, Authorization, X-Requested-With, X-Request-ID, X-HTTP-Method-Override, Cache-Control, Pragma, Expires",
-        "Access-Control-Expose-Headers": "Content-Type, Authorization, X-Request-ID, Cache-Control",
-        "Access-Control-Max-Age": "3600",
-        "Content-Length": "0"
-    }
-    
-    return JSONResponse(content="", status_code=200, headers=headers)
+# Verificação GET do webhook do WhatsApp respondida antes do roteamento
+app.add_middleware(WebhookVerifyMiddleware)
 
 # -------------------------
 # Include routers (AFTER CORS)
@@ -202,6 +137,16 @@ async def startup_event():
         # Inicializar Baileys em background (não bloquear startup)
         asyncio.create_task(initialize_baileys_background())
 
+        # Inicializar IA (LLM + chain) em background
+        asyncio.create_task(warm_up_ai_orchestrator())
+
+        # Aquecer Firestore + cache do fluxo de conversa em background
+        from app.services.orchestration_service import intelligent_orchestrator
+        asyncio.create_task(intelligent_orchestrator.warm_up())
+
+        # Limpeza periódica das memórias de conversa ociosas
+        asyncio.create_task(memory_janitor())
+
     except Exception as e:
         logger.error(f"❌ Startup initialization failed: {str(e)}")
 
@@ -209,7 +154,7 @@ async def initialize_baileys_background():
     try:
         await asyncio.sleep(3)
         logger.info("🔌 Initializing Baileys WhatsApp service in background...")
-        await baileys_service.initialize()
+        await get_baileys_service()
         logger.info("✅ Baileys WhatsApp service connection initialized")
     except Exception as baileys_error:
         logger.error(f"❌ Baileys background initialization failed: {str(baileys_error)}")
@@ -218,7 +163,7 @@ async def initialize_baileys_background():
 async def shutdown_event():
     logger.info("📴 Shutting down FastAPI application...")
     try:
-        await baileys_service.cleanup()
+        await cleanup_baileys_services()
         logger.info("✅ Services cleaned up successfully")
     except Exception as e:
         logger.warning(f"⚠️ Cleanup warning: {str(e)}")
@@ -241,7 +186,7 @@ async def health_check():
 
         try:
             whatsapp_status = await asyncio.wait_for(
-                baileys_service.get_connection_status(),
+                get_baileys_status(),
                 timeout=2.0
             )
             basic_response["services"]["whatsapp_bot"] = whatsapp_status.get("status", "unknown")
@@ -280,8 +225,11 @@ async def health_check():
 async def detailed_status():
     try:
         from app.services.orchestration_service import intelligent_orchestrator
-        service_status = await intelligent_orchestrator.get_overall_service_status()
-        whatsapp_status = await baileys_service.get_connection_status()
+        # Probes independentes em paralelo: latência = a mais lenta, não a soma
+        service_status, whatsapp_status = await asyncio.gather(
+            intelligent_orchestrator.get_overall_service_status(),
+            get_baileys_status()
+        )
 
         return {
             "overall_status": service_status["overall_status"],
@@ -364,7 +312,10 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=port,
+        workers=int(os.environ.get("WEB_CONCURRENCY", 1)),
         log_level="info",
-        access_log=True,
-        loop="asyncio"
+        access_log=False,
+        # "auto" = uvloop/httptools quando instalados, asyncio/h11 caso contrário
+        loop="auto",
+        http="auto"
     )
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+WhatsApp Webhook Verification Middleware
+
+Middleware ASGI puro que responde o handshake GET do webhook do WhatsApp
+(hub.mode / hub.verify_token / hub.challenge) antes do roteamento do FastAPI.
+Nenhum Request é materializado e nenhuma rota é resolvida para essa checagem.
+"""
+
+import hmac
+import logging
+from urllib.parse import parse_qsl
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.routes.whatsapp import VERIFY_TOKEN
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = "/api/v1/whatsapp/webhook"
+
+
+class WebhookVerifyMiddleware:
+    """Short-circuit da verificação GET do webhook do WhatsApp."""
+
+    def __init__(self, app: ASGIApp, path: str = WEBHOOK_PATH, verify_token: str = VERIFY_TOKEN):
+        self.app = app
+        self.path = path
+        self.verify_token = verify_token.encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        params = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+
+        token = params.get("hub.verify_token", "").encode()
+
+        if params.get("hub.mode") == "subscribe" and hmac.compare_digest(token, self.verify_token):
+            logger.info("✅ WhatsApp webhook verified")
+            status_code = 200
+            body = params.get("hub.challenge", "").encode("utf-8")
+        else:
+            logger.warning("⚠️ WhatsApp webhook verification failed")
+            status_code = 403
+            body = b"Forbidden"
+
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
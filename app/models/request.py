@@ -5,7 +5,8 @@ Pydantic models for validating incoming requests to the API.
 These models ensure data integrity and provide automatic documentation.
 """
 
-from pydantic import BaseModel, Field, validator
+import orjson
+from pydantic import BaseModel, Extra, Field, validator
 from typing import Optional
 
 class ChatRequest(BaseModel):
@@ -97,6 +98,10 @@ class ConversationRequest(BaseModel):
 
     class Config:
         """Pydantic configuration."""
+        extra = Extra.ignore
+        allow_mutation = False
+        anystr_strip_whitespace = True
+        json_loads = orjson.loads
         json_schema_extra = {
             "example": {
                 "message": "John Smith",
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import logging
 
 from app.models.request import ChatRequest
 from app.models.response import ChatResponse
 from app.services.ai_service import process_chat_message, get_ai_service_status
-from app.services.ai_chain import clear_conversation_memory
+from app.services.ai_chain import clear_conversation_memory, stream_chat_message
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -40,16 +40,7 @@ async def chat_endpoint(request: ChatRequest):
         response_data = ChatResponse(reply=ai_reply)
         logger.info(f"Sending reply: {response.reply}")
 
-        # Return with explicit CORS headers
-        return JSONResponse(
-            content=response_data.dict(),
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
-        )
+        return JSONResponse(content=response_data.dict())
 
     except HTTPException:
         raise
@@ -61,6 +52,23 @@ async def chat_endpoint(request: ChatRequest):
         )
 
 
+@router.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Processa uma mensagem e transmite a resposta da IA em partes (text/plain),
+    à medida que o Gemini gera o texto.
+    """
+    logger.info(f"Received chat message (stream): {request.message}")
+
+    return StreamingResponse(
+        stream_chat_message(
+            message=request.message,
+            session_id=request.session_id or "default"
+        ),
+        media_type="text/plain; charset=utf-8"
+    )
+
+
 @router.get("/chat/status")
 async def chat_status():
     """
@@ -85,19 +93,12 @@ async def chat_status():
             "endpoints": {
                 "chat": "/api/v1/chat",
                 "status": "/api/v1/chat/status",
+                "stream": "/api/v1/chat/stream",
                 "clear_memory": "/api/v1/chat/clear-memory"
             }
         }
         
-        return JSONResponse(
-            content=response_data,
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
-        )
+        return JSONResponse(content=response_data)
 
     except Exception as e:
         logger.error(f"Error getting chat status: {str(e)}")
@@ -113,18 +114,10 @@ async def clear_memory(session_id: str):
     Limpa a memória de conversa de uma sessão.
     """
     try:
-        clear_conversation_memory(session_id)
+        await clear_conversation_memory(session_id)
         response_data = {"message": f"Conversation memory cleared for session {session_id}"}
         
-        return JSONResponse(
-            content=response_data,
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
-        )
+        return JSONResponse(content=response_data)
     except Exception as e:
         logger.error(f"Error clearing conversation memory: {str(e)}")
         raise HTTPException(
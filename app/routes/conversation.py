@@ -6,9 +6,12 @@ These routes manage the guided conversation flow for lead qualification.
 """
 
 import logging
-from typing import Dict, Any, Optional
+import secrets
+import time
+from typing import Dict, Any, Optional, Tuple
+import orjson
 from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 
 from app.models.request import ConversationRequest
 from app.services.orchestration_service import intelligent_orchestrator
@@ -17,7 +20,79 @@ from app.services.orchestration_service import intelligent_orchestrator
 logger = logging.getLogger(__name__)
 
 # Create router
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Cache do fluxo de conversa: (timestamp monotônico, bytes JSON já serializados)
+FLOW_CACHE_TTL = 300
+_flow_cache: Optional[Tuple[float, bytes]] = None
+
+
+def _prerender(static_fields: Dict[str, Any]) -> bytes:
+    """Serializa a parte fixa de um fallback, sem o '}' final."""
+    return orjson.dumps(static_fields)[:-1]
+
+
+def fallback_resp(prefix: bytes, **dynamic_fields: Any) -> Response:
+    """
+    Completa um fallback pré-renderizado apenas com os campos dinâmicos
+    (session_id, error), sem serializar de novo o restante do payload.
+    """
+    parts = [prefix]
+    for key, value in dynamic_fields.items():
+        parts.append(b',"' + key.encode() + b'":' + orjson.dumps(value))
+    parts.append(b"}")
+    return Response(content=b"".join(parts), media_type="application/json")
+
+
+# ✅ FALLBACKS PRÉ-RENDERIZADOS (sempre com lead_data válido)
+_START_FALLBACK = _prerender({
+    "response": "Olá! Como posso ajudá-lo hoje?",
+    "response_type": "error_fallback",
+    "lead_data": {}
+})
+
+_RESPOND_FALLBACK = _prerender({
+    "response": "Desculpe, ocorreu um erro temporário. Vamos tentar novamente?",
+    "response_type": "system_error_recovery",
+    "lead_data": {},
+    "step": 1,
+    "flow_completed": False,
+    "ai_mode": False
+})
+
+_STATUS_FALLBACK = _prerender({
+    "status_info": {
+        "step": 1,
+        "flow_completed": False,
+        "phone_submitted": False,
+        "state": "error"
+    },
+    "lead_data": {},
+    "current_step": 1,
+    "flow_completed": False,
+    "phone_submitted": False
+})
+
+_FLOW_FALLBACK = _prerender({
+    "steps": [
+        {"id": 1, "question": "Qual é o seu nome completo?"},
+        {"id": 2, "question": "Qual o seu telefone e e-mail?"},
+        {"id": 3, "question": "Em qual área você precisa de ajuda?"},
+        {"id": 4, "question": "Descreva sua situação:"},
+        {"id": 5, "question": "Posso direcioná-lo para nosso especialista?"}
+    ],
+    "completion_message": "Obrigado! Nossa equipe entrará em contato."
+})
+
+
+def json_resp(data: Dict[str, Any], status: int = 200) -> ORJSONResponse:
+    """
+    Renderiza o payload já pronto do orchestrator direto em ORJSONResponse.
+
+    Retornar o Response pronto evita que o FastAPI passe o dict pelo
+    jsonable_encoder a cada requisição.
+    """
+    return ORJSONResponse(content=data, status_code=status)
 
 
 @router.post("/conversation/start")
@@ -38,41 +113,20 @@ async def start_conversation(session_id: Optional[str] = None):
         # ✅ USAR ORCHESTRATOR PARA SAUDAÇÃO PERSONALIZADA
         result = await intelligent_orchestrator.start_conversation(session_id)
         
-        logger.info(f"✅ Conversa iniciada: {result.get('session_id')}")
-        logger.info(f"💬 Saudação: {result.get('response', '')[:50]}...")
+        logger.info("✅ Conversa iniciada: %s", result.get('session_id'))
+        logger.info("💬 Saudação: %s...", result.get('response', '')[:50])
         
-        return JSONResponse(
-            content=result,
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
-        )
+        return json_resp(result)
         
     except Exception as e:
-        logger.error(f"❌ Erro ao iniciar conversa: {str(e)}")
-        logger.error(f"❌ Stack trace:", exc_info=True)
+        logger.error("❌ Erro ao iniciar conversa: %s", e)
+        logger.error("❌ Stack trace:", exc_info=True)
         
         # ✅ FALLBACK COM LEAD_DATA VÁLIDO
-        fallback_response = {
-            "session_id": f"error_{hash(str(e)) % 10000}",
-            "response": "Olá! Como posso ajudá-lo hoje?",
-            "response_type": "error_fallback",
-            "error": str(e),
-            "lead_data": {}  # ✅ SEMPRE RETORNAR LEAD_DATA VÁLIDO
-        }
-        
-        return JSONResponse(
-            content=fallback_response,
-            status_code=200,  # Não retornar 500 para não quebrar frontend
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
+        return fallback_resp(  # Não retornar 500 para não quebrar frontend
+            _START_FALLBACK,
+            session_id=f"error_{secrets.token_hex(4)}",
+            error=str(e)
         )
 
 
@@ -88,13 +142,13 @@ async def respond_to_conversation(request: ConversationRequest):
     - Sempre retorna lead_data válido
     """
     try:
-        logger.info(f"📨 Processando resposta: {request.message[:50]}...")
-        logger.info(f"🆔 Session ID: {request.session_id}")
+        logger.info("📨 Processando resposta: %s...", request.message[:50])
+        logger.info("🆔 Session ID: %s", request.session_id)
         
         # ✅ PROCESSAR VIA ORCHESTRATOR COM VALIDAÇÃO RIGOROSA
         result = await intelligent_orchestrator.process_message(
             message=request.message,
-            session_id=request.session_id or f"web_{hash(request.message) % 10000}",
+            session_id=request.session_id or f"web_{secrets.token_hex(4)}",
             platform="web"
         )
         
@@ -103,45 +157,21 @@ async def respond_to_conversation(request: ConversationRequest):
             result["lead_data"] = {}
             logger.warning("⚠️ lead_data ausente no resultado, adicionado automaticamente")
         
-        logger.info(f"✅ Resposta processada: {result.get('response_type', 'unknown')}")
-        logger.info(f"📊 Lead data presente: {bool(result.get('lead_data'))}")
+        logger.info("✅ Resposta processada: %s", result.get('response_type', 'unknown'))
+        logger.info("📊 Lead data presente: %s", bool(result.get('lead_data')))
         
-        return JSONResponse(
-            content=result,
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
-        )
+        return json_resp(result)
         
     except Exception as e:
-        logger.error(f"❌ Erro ao processar resposta: {str(e)}")
-        logger.error(f"❌ Request data: message='{request.message}', session_id='{request.session_id}'")
-        logger.error(f"❌ Stack trace:", exc_info=True)
+        logger.error("❌ Erro ao processar resposta: %s", e)
+        logger.error("❌ Request data: message='%s', session_id='%s'", request.message, request.session_id)
+        logger.error("❌ Stack trace:", exc_info=True)
         
         # ✅ FALLBACK SEGURO COM LEAD_DATA VÁLIDO
-        error_response = {
-            "session_id": request.session_id or f"error_{hash(str(e)) % 10000}",
-            "response": "Desculpe, ocorreu um erro temporário. Vamos tentar novamente?",
-            "response_type": "system_error_recovery",
-            "error": str(e),
-            "lead_data": {},  # ✅ SEMPRE RETORNAR LEAD_DATA VÁLIDO
-            "step": 1,
-            "flow_completed": False,
-            "ai_mode": False
-        }
-        
-        return JSONResponse(
-            content=error_response,
-            status_code=200,  # ✅ NÃO RETORNAR 500 PARA NÃO QUEBRAR FRONTEND
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
+        return fallback_resp(  # ✅ NÃO RETORNAR 500 PARA NÃO QUEBRAR FRONTEND
+            _RESPOND_FALLBACK,
+            session_id=request.session_id or f"error_{secrets.token_hex(4)}",
+            error=str(e)
         )
 
 
@@ -156,7 +186,7 @@ async def get_conversation_status(session_id: str):
     - Correção automática de sessões antigas
     """
     try:
-        logger.info(f"📊 Obtendo status da conversa: {session_id}")
+        logger.info("📊 Obtendo status da conversa: %s", session_id)
         
         # ✅ OBTER CONTEXTO VIA ORCHESTRATOR
         context = await intelligent_orchestrator.get_session_context(session_id)
@@ -166,47 +196,19 @@ async def get_conversation_status(session_id: str):
             context["lead_data"] = {}
             logger.warning("⚠️ lead_data ausente no contexto, adicionado automaticamente")
         
-        logger.info(f"✅ Status obtido: {context.get('current_step', 'unknown')}")
+        logger.info("✅ Status obtido: %s", context.get('current_step', 'unknown'))
         
-        return JSONResponse(
-            content=context,
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
-        )
+        return json_resp(context)
         
     except Exception as e:
-        logger.error(f"❌ Erro ao obter status: {str(e)}")
-        logger.error(f"❌ Stack trace:", exc_info=True)
+        logger.error("❌ Erro ao obter status: %s", e)
+        logger.error("❌ Stack trace:", exc_info=True)
         
         # ✅ FALLBACK SEGURO
-        error_context = {
-            "session_id": session_id,
-            "error": str(e),
-            "status_info": {
-                "step": 1,
-                "flow_completed": False,
-                "phone_submitted": False,
-                "state": "error"
-            },
-            "lead_data": {},  # ✅ SEMPRE RETORNAR LEAD_DATA VÁLIDO
-            "current_step": 1,
-            "flow_completed": False,
-            "phone_submitted": False
-        }
-        
-        return JSONResponse(
-            content=error_context,
-            status_code=200,  # ✅ NÃO RETORNAR 500
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
+        return fallback_resp(  # ✅ NÃO RETORNAR 500
+            _STATUS_FALLBACK,
+            session_id=session_id,
+            error=str(e)
         )
 
 
@@ -216,7 +218,14 @@ async def get_conversation_flow():
     ✅ OBTER FLUXO DE CONVERSA
     
     Retorna o fluxo de conversa configurado no Firebase.
+    O fluxo muda raramente, então a resposta serializada fica em cache
+    por FLOW_CACHE_TTL segundos.
     """
+    global _flow_cache
+
+    if _flow_cache is not None and time.monotonic() - _flow_cache[0] < FLOW_CACHE_TTL:
+        return Response(content=_flow_cache[1], media_type="application/json")
+
     try:
         from app.services.firebase_service import get_conversation_flow
         
@@ -224,44 +233,40 @@ async def get_conversation_flow():
         
         flow = await get_conversation_flow()
         
-        logger.info(f"✅ Fluxo obtido: {len(flow.get('steps', []))} steps")
+        logger.info("✅ Fluxo obtido: %s steps", len(flow.get('steps', [])))
         
-        return JSONResponse(
-            content=flow,
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
-        )
+        body = orjson.dumps(flow)
+        _flow_cache = (time.monotonic(), body)
+        
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
-        logger.error(f"❌ Erro ao obter fluxo: {str(e)}")
+        logger.error("❌ Erro ao obter fluxo: %s", e)
         
         # ✅ FALLBACK COM FLUXO BÁSICO
-        fallback_flow = {
-            "steps": [
-                {"id": 1, "question": "Qual é o seu nome completo?"},
-                {"id": 2, "question": "Qual o seu telefone e e-mail?"},
-                {"id": 3, "question": "Em qual área você precisa de ajuda?"},
-                {"id": 4, "question": "Descreva sua situação:"},
-                {"id": 5, "question": "Posso direcioná-lo para nosso especialista?"}
-            ],
-            "completion_message": "Obrigado! Nossa equipe entrará em contato.",
-            "error": str(e)
-        }
-        
-        return JSONResponse(
-            content=fallback_flow,
-            status_code=200,
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
-        )
+        return fallback_resp(_FLOW_FALLBACK, error=str(e))
+
+
+@router.post("/conversation/flow/invalidate")
+async def invalidate_conversation_flow():
+    """
+    ✅ INVALIDAR CACHE DO FLUXO
+
+    Descarta o fluxo em cache (rota e orquestrador) para que a próxima
+    leitura busque no Firebase.
+    """
+    global _flow_cache
+
+    was_cached = _flow_cache is not None
+    _flow_cache = None
+    was_cached = intelligent_orchestrator.invalidate_flow_cache() or was_cached
+
+    logger.info("🧹 Cache do fluxo de conversa invalidado")
+
+    return json_resp({
+        "success": True,
+        "was_cached": was_cached
+    })
 
 
 @router.post("/conversation/reset-session/{session_id}")
@@ -273,42 +278,25 @@ async def reset_session(session_id: str):
     Remove o problema de "finalizado" permanente.
     """
     try:
-        logger.info(f"🔄 Resetando sessão: {session_id}")
+        logger.info("🔄 Resetando sessão: %s", session_id)
         
         # ✅ CRIAR NOVA SESSÃO LIMPA
         result = await intelligent_orchestrator.start_conversation(session_id)
         
-        logger.info(f"✅ Sessão resetada: {session_id}")
+        logger.info("✅ Sessão resetada: %s", session_id)
         
-        return JSONResponse(
-            content={
-                "success": True,
-                "message": "Sessão resetada com sucesso",
-                "session_id": session_id,
-                "new_conversation": result
-            },
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
-        )
+        return json_resp({
+            "success": True,
+            "message": "Sessão resetada com sucesso",
+            "session_id": session_id,
+            "new_conversation": result
+        })
         
     except Exception as e:
-        logger.error(f"❌ Erro ao resetar sessão: {str(e)}")
+        logger.error("❌ Erro ao resetar sessão: %s", e)
         
-        return JSONResponse(
-            content={
-                "success": False,
-                "error": str(e),
-                "session_id": session_id
-            },
-            status_code=200,
-            headers={
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Credentials": "true",
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            }
-        )
\ No newline at end of file
+        return json_resp({
+            "success": False,
+            "error": str(e),
+            "session_id": session_id
+        })
\ No newline at end of file
@@ -1,21 +1,69 @@
+import asyncio
+import hmac
 import logging
 import os
 import re
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
+import orjson
+from cachetools import TTLCache
 from fastapi import APIRouter, HTTPException, Request, BackgroundTasks
-from fastapi.responses import PlainTextResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import ORJSONResponse, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, Extra, Field, ValidationError
 
 from app.services.orchestration_service import intelligent_orchestrator
-from app.services.baileys_service import send_baileys_message, get_baileys_status, baileys_service
+from app.services.baileys_service import send_baileys_message, get_baileys_status, get_baileys_service
 from app.services.firebase_service import save_user_session, get_user_session
+from app.utils.phone import digits_only, normalize_br_phone
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 VERIFY_TOKEN = os.getenv("WHATSAPP_VERIFY_TOKEN", "s3nh@-webhook-2025-XYz")
+_VERIFY_TOKEN_B = VERIFY_TOKEN.encode()
+
+# Padrões compilados uma única vez (caminho quente do webhook)
+# Alternação única com grupos nomeados, UUID primeiro (formato mais comum)
+_SESSION_RE = re.compile(
+    r'(?P<uuid>[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})'
+    r'|(?P<wa>whatsapp_\w+_\w+)'
+    r'|(?P<sess>session_[\w-]+)'
+    r'|(?P<web>web_\d+)',
+    re.IGNORECASE
+)
+_SID_BAD_CHARS = frozenset('<>"\'\\\n\r\t')
+
+# Cache em processo das autorizações (session_id -> auth_data do Firebase).
+# A expiração real (expires_at) continua sendo validada a cada mensagem.
+_auth_cache: TTLCache = TTLCache(maxsize=10_000, ttl=300)
+
+# LRU dos message_ids já processados (message_id -> resposta do webhook).
+# O Baileys reentrega webhooks; uma reentrega devolve a resposta anterior.
+SEEN_MESSAGES_MAX = 4096
+_seen_messages: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+def _remember_message(message_id: str, content: Dict[str, Any]) -> None:
+    # Sem await entre inserção e despejo: não há intercalação entre requisições
+    _seen_messages[message_id] = content
+    if len(_seen_messages) > SEEN_MESSAGES_MAX:
+        _seen_messages.popitem(last=False)
+
+def remember_webhook_response(message_id: str, content: Dict[str, Any]) -> ORJSONResponse:
+    _remember_message(message_id, content)
+    return ORJSONResponse(content=content)
+
+# Timestamp ISO recalculado no máximo uma vez por segundo
+_ts_cache = [0, ""]
+
+def iso_now_cached() -> str:
+    now = int(time.time())
+    if now != _ts_cache[0]:
+        _ts_cache[:] = [now, datetime.utcfromtimestamp(now).isoformat()]
+    return _ts_cache[1]
 
 # =================== MODELOS ===================
 
@@ -24,7 +72,13 @@ class WhatsAppAuthorizationRequest(BaseModel):
     phone_number: str = Field(..., description="WhatsApp phone number")
     source: str = Field(default="landing_page", description="Authorization source")
     user_data: Optional[Dict[str, Any]] = Field(default=None, description="User data")
-    timestamp: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
+    timestamp: str = Field(default_factory=iso_now_cached)
+
+    class Config:
+        extra = Extra.ignore
+        allow_mutation = False
+        anystr_strip_whitespace = True
+        json_loads = orjson.loads
 
 class WhatsAppAuthorizationResponse(BaseModel):
     status: str
@@ -39,18 +93,15 @@ class WhatsAppAuthorizationResponse(BaseModel):
 # =================== VALIDAÇÃO ===================
 
 def validate_phone_number(phone: str) -> str:
-    phone_clean = re.sub(r'[^\d]', '', phone)
+    phone_clean = digits_only(phone)
     
     if len(phone_clean) == 11:
         phone_clean = f"55{phone_clean}"
-    elif len(phone_clean) == 13 and phone_clean.startswith("55"):
+    elif len(phone_clean) == 13 and phone_clean[:2] == "55":
         pass
     else:
         raise ValueError(f"Invalid phone number format: {phone}")
     
-    if not phone_clean.startswith("55"):
-        raise ValueError("Phone number must be Brazilian (+55)")
-    
     area_code = phone_clean[2:4]
     number = phone_clean[4:]
     
@@ -69,31 +120,35 @@ def validate_session_id(session_id: str) -> str:
     if len(session_id) == 36:
         uuid.UUID(session_id)
     
-    if re.search(r'[<>"\'\\\n\r\t]', session_id):
+    if not _SID_BAD_CHARS.isdisjoint(session_id):
         raise ValueError("Invalid characters in session ID")
     
     return session_id.strip()
 
+async def read_json_body(request: Request) -> Dict[str, Any]:
+    """Lê o corpo JSON com orjson; corpo inválido vira HTTP 400."""
+    try:
+        body = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="JSON body must be an object")
+    
+    return body
+
 # =================== AUTORIZAÇÃO ===================
 
 def extract_session_from_message(message: str) -> Optional[str]:
     if not message:
         return None
         
-    patterns = [
-        r'whatsapp_\w+_\w+',
-        r'session_[\w-]+',
-        r'web_\d+',
-        r'[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}',
-    ]
+    match = _SESSION_RE.search(message)
+    if match:
+        session_id = match.group(0)
+        logger.info("🔍 Session ID extraído (%s): %s", match.lastgroup, session_id)
+        return session_id
     
-    for pattern in patterns:
-        match = re.search(pattern, message, re.IGNORECASE)
-        if match:
-            session_id = match.group(0)
-            logger.info(f"🔍 Session ID extraído: {session_id}")
-            return session_id
-            
     return None
 
 async def is_session_authorized(session_id: str) -> Dict[str, Any]:
@@ -101,13 +156,22 @@ async def is_session_authorized(session_id: str) -> Dict[str, Any]:
         if not session_id:
             return {"authorized": False, "action": "IGNORE_COMPLETELY", "reason": "no_session_id"}
             
-        auth_data = await get_user_session(f"whatsapp_auth_session:{session_id}")
+        auth_data = _auth_cache.get(session_id)
+        if auth_data is None:
+            auth_data = await get_user_session(f"whatsapp_auth_session:{session_id}")
+            if auth_data:
+                _auth_cache[session_id] = auth_data
         
         if not auth_data:
             return {"authorized": False, "action": "IGNORE_COMPLETELY", "reason": "session_not_authorized"}
         
+        expires_at_epoch = auth_data.get("expires_at_epoch")
         expires_at_str = auth_data.get("expires_at", "")
-        if expires_at_str:
+        if expires_at_epoch is not None:
+            if time.time() > expires_at_epoch:
+                return {"authorized": False, "action": "IGNORE_COMPLETELY", "reason": "session_expired"}
+        elif expires_at_str:
+            # Autorizações antigas, salvas antes do expires_at_epoch
             try:
                 expires_at = datetime.fromisoformat(expires_at_str.replace('Z', '+00:00'))
                 is_expired = datetime.now(expires_at.tzinfo) > expires_at
@@ -115,7 +179,7 @@ async def is_session_authorized(session_id: str) -> Dict[str, Any]:
                 if is_expired:
                     return {"authorized": False, "action": "IGNORE_COMPLETELY", "reason": "session_expired"}
             except Exception as date_error:
-                logger.warning(f"⚠️ Erro ao verificar expiração: {str(date_error)}")
+                logger.warning("⚠️ Erro ao verificar expiração: %s", date_error)
         
         return {
             "authorized": True,
@@ -128,38 +192,83 @@ async def is_session_authorized(session_id: str) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"❌ Erro ao verificar autorização: {str(e)}")
+        logger.error("❌ Erro ao verificar autorização: %s", e)
         return {"authorized": False, "action": "IGNORE_COMPLETELY", "reason": "error", "error": str(e)}
 
 async def save_session_authorization(session_id: str, auth_data: Dict[str, Any]):
     try:
         await save_user_session(f"whatsapp_auth_session:{session_id}", auth_data)
-        logger.info(f"✅ Autorização salva: {session_id}")
+        _auth_cache[session_id] = auth_data
+        logger.info("✅ Autorização salva: %s", session_id)
     except Exception as e:
-        logger.error(f"❌ Erro ao salvar autorização: {str(e)}")
+        logger.error("❌ Erro ao salvar autorização: %s", e)
         raise
 
+async def _post_authorize(auth_data: Dict[str, Any], orchestrator_data: Dict[str, Any]):
+    """Persiste a autorização e avisa o orchestrator em paralelo (uma única background task)."""
+    results = await asyncio.gather(
+        save_session_authorization(auth_data["session_id"], auth_data),
+        intelligent_orchestrator.handle_whatsapp_authorization(orchestrator_data),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error("❌ Erro no pós-autorização %s: %s", auth_data['session_id'], result)
+
 # =================== WEBHOOK ===================
 
 @router.get("/whatsapp/webhook")
 async def verify_whatsapp_webhook(request: Request):
     params = request.query_params
     mode = params.get("hub.mode")
-    token = params.get("hub.verify_token")
+    token = params.get("hub.verify_token", "").encode()
     challenge = params.get("hub.challenge")
 
-    if mode == "subscribe" and token == VERIFY_TOKEN:
+    if mode == "subscribe" and hmac.compare_digest(token, _VERIFY_TOKEN_B):
         logger.info("✅ WhatsApp webhook verified")
-        return PlainTextResponse(challenge or "")
+        return Response(content=challenge.encode() if challenge else b"", media_type="text/plain")
     
     logger.warning("⚠️ WhatsApp webhook verification failed")
-    return PlainTextResponse("Forbidden", status_code=403)
+    return Response(content=b"Forbidden", status_code=403, media_type="text/plain")
+
+async def _process_and_send(message_text: str, session_id: str, clean_phone: str):
+    """Processa a mensagem no orchestrator e envia a resposta pelo Baileys (fora do ciclo do webhook)."""
+    try:
+        orchestrator_response = await intelligent_orchestrator.process_message(
+            message=message_text,
+            session_id=session_id,
+            phone_number=clean_phone,
+            platform="whatsapp"
+        )
+        
+        ai_response = orchestrator_response.get("response", "")
+        
+        if not ai_response or not isinstance(ai_response, str) or ai_response.strip() == "":
+            ai_response = "Obrigado pela sua mensagem! Nossa equipe entrará em contato em breve."
+            logger.warning("⚠️ Response vazio, usando fallback")
+        
+        logger.info("✅ Response: '%s...'", ai_response[:50])
+        
+        sent = await send_baileys_message(clean_phone, ai_response)
+        if not sent:
+            logger.error("❌ Falha ao enviar resposta via Baileys | session=%s", session_id)
+    except Exception as e:
+        logger.error("❌ Erro ao processar mensagem em background | session=%s: %s", session_id, e)
 
 @router.post("/whatsapp/webhook")
-async def whatsapp_webhook(request: Request):
+async def whatsapp_webhook(request: Request, background_tasks: BackgroundTasks):
+    reservation = None
     try:
-        payload = await request.json()
-        logger.info(f"📨 WhatsApp webhook: {payload}")
+        try:
+            payload = orjson.loads(await request.body())
+        except orjson.JSONDecodeError:
+            payload = None
+        
+        if not isinstance(payload, dict):
+            logger.warning("⚠️ Invalid webhook payload")
+            return ORJSONResponse(content={"status": "error", "message": "Invalid payload", "response": "Erro: mensagem inválida"})
+        
+        logger.info("📨 WhatsApp webhook: %s", payload)
 
         message_text = payload.get("message", "").strip()
         phone_number = payload.get("from", "")
@@ -169,30 +278,46 @@ async def whatsapp_webhook(request: Request):
         
         if not message_text or not phone_number or not message_id:
             logger.warning("⚠️ Invalid webhook payload")
-            return {"status": "error", "message": "Invalid payload", "response": "Erro: mensagem inválida"}
+            return ORJSONResponse(content={"status": "error", "message": "Invalid payload", "response": "Erro: mensagem inválida"})
+
+        cached_response = _seen_messages.get(message_id)
+        if cached_response is not None:
+            _seen_messages.move_to_end(message_id)
+            logger.info("♻️ Mensagem reentregue, reutilizando resposta | message_id=%s", message_id)
+            return ORJSONResponse(content=cached_response)
 
-        logger.info(f"🔍 Verificando autorização | phone={clean_phone}")
+        logger.info("🔍 Verificando autorização | phone=%s", clean_phone)
 
         session_id = extract_session_from_message(message_text)
         
         if not session_id:
-            logger.info(f"❌ IGNORANDO - Nenhum session_id encontrado: {clean_phone}")
-            return {
+            logger.info("❌ IGNORANDO - Nenhum session_id encontrado: %s", clean_phone)
+            return ORJSONResponse(content={
                 "status": "ignored",
                 "phone_number": clean_phone,
                 "message_id": message_id,
                 "action": "IGNORE_COMPLETELY",
                 "reason": "no_session_id_in_message",
                 "response": ""
-            }
+            })
+        
+        # Reserva o message_id antes do primeiro await: uma reentrega concorrente
+        # recebe este ACK provisório em vez de processar a mensagem de novo
+        reservation = {
+            "status": "processing",
+            "message_id": message_id,
+            "session_id": session_id,
+            "response": ""
+        }
+        _remember_message(message_id, reservation)
         
         auth_check = await is_session_authorized(session_id)
         
         if not auth_check["authorized"]:
             reason = auth_check.get("reason", "unknown")
-            logger.info(f"❌ IGNORANDO - Session não autorizado: {session_id} - {reason}")
+            logger.info("❌ IGNORANDO - Session não autorizado: %s - %s", session_id, reason)
             
-            return {
+            return remember_webhook_response(message_id, {
                 "status": "ignored",
                 "phone_number": clean_phone,
                 "session_id": session_id,
@@ -200,101 +325,99 @@ async def whatsapp_webhook(request: Request):
                 "action": "IGNORE_COMPLETELY",
                 "reason": reason,
                 "response": ""
-            }
+            })
 
         source = auth_check.get("source", "unknown")
-        user_data = auth_check.get("user_data", {})
         lead_type = auth_check.get("lead_type", "continuous_chat")
         
-        logger.info(f"✅ DELEGANDO para orchestrator | session={session_id} | source={source}")
+        logger.info("✅ DELEGANDO para orchestrator em background | session=%s | source=%s", session_id, source)
 
-        orchestrator_response = await intelligent_orchestrator.process_message(
-            message=message_text,
-            session_id=session_id,
-            phone_number=clean_phone,
-            platform="whatsapp"
-        )
-        
-        ai_response = orchestrator_response.get("response", "")
-        response_type = orchestrator_response.get("response_type", "orchestrated")
+        background_tasks.add_task(_process_and_send, message_text, session_id, clean_phone)
         
-        if not ai_response or not isinstance(ai_response, str) or ai_response.strip() == "":
-            ai_response = "Obrigado pela sua mensagem! Nossa equipe entrará em contato em breve."
-            logger.warning(f"⚠️ Response vazio, usando fallback")
-        
-        logger.info(f"✅ Response: '{ai_response[:50]}...'")
-        
-        return {
-            "status": "success",
+        return remember_webhook_response(message_id, {
+            "status": "accepted",
             "message_id": message_id,
             "session_id": session_id,
             "phone_number": clean_phone,
             "source": source,
             "lead_type": lead_type,
             "authorized": True,
-            "response": ai_response,
-            "response_type": response_type,
-            "current_step": orchestrator_response.get("current_step", ""),
-            "message_count": orchestrator_response.get("message_count", 1)
-        }
+            "response": "",
+            "response_type": "queued"
+        })
 
     except Exception as e:
-        logger.error(f"❌ WhatsApp webhook error: {str(e)}")
+        logger.error("❌ WhatsApp webhook error: %s", e)
+        # Falhou antes de decidir: libera a reserva para a reentrega tentar de novo
+        if reservation is not None and _seen_messages.get(reservation["message_id"]) is reservation:
+            del _seen_messages[reservation["message_id"]]
         
-        return {
+        return ORJSONResponse(content={
             "status": "error",
             "message": str(e),
             "response_type": "error_message",
             "response": "Desculpe, ocorreu um erro temporário. Tente novamente em alguns minutos.",
             "phone_number": clean_phone if 'clean_phone' in locals() else "",
             "message_id": message_id if 'message_id' in locals() else ""
-        }
+        })
 
 # =================== GATILHO INICIAL ===================
 
 @router.post("/whatsapp/send-initial-message")
-async def send_initial_whatsapp_message(request: dict):
+async def send_initial_whatsapp_message(request: Request):
     """
     ✅ ENDPOINT PARA TESTE DE ENVIO WHATSAPP
     
     Usado para testar o envio de mensagens WhatsApp via VM
     """
     try:
-        phone_number = request.get("phone_number", "")
-        message = request.get("message", "Teste de mensagem do backend")
+        body = await read_json_body(request)
+        phone_number = body.get("phone_number", "")
+        message = body.get("message", "Teste de mensagem do backend")
         
         if not phone_number:
             raise HTTPException(status_code=400, detail="phone_number é obrigatório")
         
-        logger.info(f"📱 Teste de envio WhatsApp para {phone_number}")
+        logger.info("📱 Teste de envio WhatsApp para %s", phone_number)
         
         # ✅ CORREÇÃO: Passar apenas número limpo
-        clean_phone = ''.join(filter(str.isdigit, phone_number))
-        if not clean_phone.startswith("55"):
-            clean_phone = f"55{clean_phone}"
+        clean_phone = normalize_br_phone(phone_number)
         
-        success = await baileys_service.send_whatsapp_message(clean_phone, message)
+        success = await send_baileys_message(clean_phone, message)
         
         return {
             "status": "success" if success else "failed",
             "message": "Mensagem enviada com sucesso" if success else "Falha no envio",
             "phone_number": clean_phone,
             "sent_message": message,
-            "vm_endpoint": baileys_service.base_url
+            "vm_endpoint": (await get_baileys_service()).base_url
         }
             
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Erro no teste de envio WhatsApp: {str(e)}")
+        logger.error("❌ Erro no teste de envio WhatsApp: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # =================== AUTORIZAÇÃO ===================
 
-@router.post("/whatsapp/authorize")
-async def authorize_whatsapp_session(request: WhatsAppAuthorizationRequest, background_tasks: BackgroundTasks):
+@router.post(
+    "/whatsapp/authorize",
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": WhatsAppAuthorizationRequest.schema()}}
+    }}
+)
+async def authorize_whatsapp_session(http_request: Request, background_tasks: BackgroundTasks):
+    # Corpo validado direto do JSON bruto (orjson + pydantic), sem o dict intermediário do FastAPI
+    try:
+        request = WhatsAppAuthorizationRequest.parse_raw(await http_request.body())
+    except ValidationError as e:
+        # Mesmo formato do FastAPI para erros de corpo: loc começa com "body"
+        raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors()])
+    
     try:
-        logger.info(f"🚀 Autorizando sessão: {request.session_id}")
+        logger.info("🚀 Autorizando sessão: %s", request.session_id)
         
         validated_phone = validate_phone_number(request.phone_number)
         validated_session = validate_session_id(request.session_id)
@@ -305,15 +428,14 @@ async def authorize_whatsapp_session(request: WhatsAppAuthorizationRequest, back
             "phone_number": validated_phone,
             "source": request.source,
             "authorized": True,
-            "authorized_at": datetime.utcnow().isoformat(),
+            "authorized_at": iso_now_cached(),
             "expires_at": (datetime.utcnow() + timedelta(seconds=expires_in)).isoformat(),
+            "expires_at_epoch": int(time.time()) + expires_in,
             "user_data": request.user_data or {},
             "timestamp": request.timestamp,
             "lead_type": "landing_chat_lead" if request.source == "landing_chat" else "whatsapp_button_lead"
         }
         
-        background_tasks.add_task(save_session_authorization, validated_session, authorization_data)
-        
         auth_data_for_orchestrator = {
             "session_id": validated_session,
             "phone_number": validated_phone,
@@ -321,7 +443,7 @@ async def authorize_whatsapp_session(request: WhatsAppAuthorizationRequest, back
             "user_data": request.user_data or {}
         }
         
-        background_tasks.add_task(intelligent_orchestrator.handle_whatsapp_authorization, auth_data_for_orchestrator)
+        background_tasks.add_task(_post_authorize, authorization_data, auth_data_for_orchestrator)
         
         source_descriptions = {
             "landing_chat": "Chat da landing page completado",
@@ -330,25 +452,26 @@ async def authorize_whatsapp_session(request: WhatsAppAuthorizationRequest, back
         }
         source_msg = source_descriptions.get(request.source, request.source)
         
-        logger.info(f"✅ Autorização criada | Session: {validated_session} | Origem: {source_msg}")
+        logger.info("✅ Autorização criada | Session: %s | Origem: %s", validated_session, source_msg)
         
-        return WhatsAppAuthorizationResponse(
+        auth_response = WhatsAppAuthorizationResponse(
             status="authorized",
             session_id=validated_session,
             phone_number=validated_phone,
             source=request.source,
             message=f"Sessão {validated_session} autorizada - {source_msg}",
-            timestamp=datetime.utcnow().isoformat(),
+            timestamp=iso_now_cached(),
             expires_in=expires_in,
             whatsapp_url=f"https://wa.me/{validated_phone}"
         )
+        return ORJSONResponse(content=auth_response.dict())
         
     except ValueError as e:
-        logger.error(f"❌ Erro de validação: {str(e)}")
+        logger.error("❌ Erro de validação: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     
     except Exception as e:
-        logger.error(f"❌ Erro ao autorizar sessão: {str(e)}")
+        logger.error("❌ Erro ao autorizar sessão: %s", e)
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 # =================== CONSULTAS ===================
@@ -356,53 +479,54 @@ async def authorize_whatsapp_session(request: WhatsAppAuthorizationRequest, back
 @router.get("/whatsapp/check-auth/{session_id}")
 async def check_whatsapp_authorization(session_id: str):
     try:
-        logger.info(f"📱 Verificando autorização: {session_id}")
+        logger.info("📱 Verificando autorização: %s", session_id)
         
         auth_check = await is_session_authorized(session_id)
         
         status_msg = "AUTORIZADO" if auth_check["authorized"] else "NÃO AUTORIZADO"
-        logger.info(f"{'✅' if auth_check['authorized'] else '❌'} {status_msg}: {session_id}")
+        logger.info("%s %s: %s", '✅' if auth_check['authorized'] else '❌', status_msg, session_id)
         
         return {
             "session_id": session_id,
             **auth_check,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": iso_now_cached()
         }
         
     except Exception as e:
-        logger.error(f"❌ Erro ao verificar sessão: {str(e)}")
+        logger.error("❌ Erro ao verificar sessão: %s", e)
         return {
             "session_id": session_id,
             "authorized": False,
             "action": "IGNORE_COMPLETELY",
             "reason": "error",
             "error": str(e),
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": iso_now_cached()
         }
 
 @router.delete("/whatsapp/revoke-auth/{session_id}")
 async def revoke_whatsapp_authorization(session_id: str):
     try:
         validated_session = validate_session_id(session_id)
+        _auth_cache.pop(validated_session, None)
         await save_user_session(f"whatsapp_auth_session:{validated_session}", None)
         
-        logger.info(f"🗑️ Autorização revogada: {validated_session}")
+        logger.info("🗑️ Autorização revogada: %s", validated_session)
         
         return {
             "session_id": validated_session,
             "status": "revoked",
             "message": "Autorização removida com sucesso",
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": iso_now_cached()
         }
         
     except Exception as e:
-        logger.error(f"❌ Erro ao revogar: {str(e)}")
+        logger.error("❌ Erro ao revogar: %s", e)
         raise HTTPException(status_code=500, detail="Erro ao revogar autorização")
 
 @router.get("/whatsapp/sessions/{session_id}")
 async def get_whatsapp_session_info(session_id: str):
     try:
-        logger.info(f"📊 Buscando info da sessão: {session_id}")
+        logger.info("📊 Buscando info da sessão: %s", session_id)
         
         session_info = await intelligent_orchestrator.get_session_context(session_id)
         
@@ -411,67 +535,68 @@ async def get_whatsapp_session_info(session_id: str):
             "session_id": session_id,
             "session_info": session_info,
             "platform": "whatsapp",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": iso_now_cached()
         }
     
     except Exception as e:
-        logger.error(f"❌ Erro ao buscar sessão {session_id}: {str(e)}")
+        logger.error("❌ Erro ao buscar sessão %s: %s", session_id, e)
         return {
             "status": "error",
             "session_id": session_id,
             "error": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": iso_now_cached()
         }
 
 # =================== BAILEYS ===================
 
 @router.post("/whatsapp/send")
-async def send_whatsapp_message(request: dict):
+async def send_whatsapp_message(request: Request):
     try:
-        phone_number = request.get("phone_number", "")
-        message = request.get("message", "")
+        body = await read_json_body(request)
+        phone_number = body.get("phone_number", "")
+        message = body.get("message", "")
         
         if not phone_number or not message:
             raise HTTPException(status_code=400, detail="Missing phone_number or message")
 
         # ✅ LIMPEZA DO NÚMERO
-        clean_phone = ''.join(filter(str.isdigit, phone_number))
-        if not clean_phone.startswith("55"):
-            clean_phone = f"55{clean_phone}"
+        clean_phone = normalize_br_phone(phone_number)
         
-        logger.info(f"📤 ENVIO MANUAL WHATSAPP")
-        logger.info(f"   Para: {clean_phone}")
-        logger.info(f"   Mensagem: {message[:50]}...")
+        logger.info("📤 ENVIO MANUAL WHATSAPP")
+        logger.info("   Para: %s", clean_phone)
+        logger.info("   Mensagem: %s...", message[:50])
         
-        success = await baileys_service.send_whatsapp_message(clean_phone, message)
+        success = await send_baileys_message(clean_phone, message)
 
         if success:
-            logger.info(f"✅ MENSAGEM ENVIADA COM SUCESSO para {clean_phone}")
+            logger.info("✅ MENSAGEM ENVIADA COM SUCESSO para %s", clean_phone)
             return {
                 "status": "success", 
                 "message": "✅ WhatsApp message sent successfully", 
                 "to": clean_phone,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": iso_now_cached()
             }
         
-        logger.error(f"❌ FALHA AO ENVIAR para {clean_phone}")
+        logger.error("❌ FALHA AO ENVIAR para %s", clean_phone)
         raise HTTPException(status_code=500, detail="Failed to send WhatsApp message")
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"❌ Erro ao enviar: {str(e)}")
+        logger.error("❌ Erro ao enviar: %s", e)
         raise HTTPException(status_code=500, detail=f"WhatsApp message sending error: {str(e)}")
 
 @router.get("/whatsapp/status")
 async def whatsapp_status():
     try:
         status = await get_baileys_status()
-        logger.info(f"📊 Status WhatsApp: {status.get('status', 'unknown')}")
+        logger.info("📊 Status WhatsApp: %s", status.get('status', 'unknown'))
         return status
     except Exception as e:
-        logger.error(f"❌ Erro ao obter status: {str(e)}")
+        logger.error("❌ Erro ao obter status: %s", e)
         return {
             "service": "baileys_whatsapp", 
             "status": "error", 
             "error": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": iso_now_cached()
         }
\ No newline at end of file
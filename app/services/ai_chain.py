@@ -6,31 +6,131 @@ It handles conversation memory, system prompts, and AI response generation.
 """
 
 import os
-import json
+import time
+import hashlib
+import weakref
+import functools
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, AsyncIterator
 from datetime import datetime
 
+import orjson
+import redis.asyncio as aioredis
+from cachetools import TTLCache
+
 # LangChain imports
 from langchain.memory import ConversationBufferWindowMemory
-from langchain.schema import BaseMessage, HumanMessage, AIMessage
+from langchain.schema import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.schema.runnable import RunnablePassthrough
+from langchain.schema.runnable import RunnableLambda
 from langchain.schema.output_parser import StrOutputParser
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Global conversation memories (session-based)
-conversation_memories: Dict[str, ConversationBufferWindowMemory] = {}
-
 # AI configuration
 AI_CONFIG_FILE = "app/ai_schema.json"
 DEFAULT_MODEL = "gemini-1.5-flash"
 DEFAULT_TEMPERATURE = 0.7
 DEFAULT_MAX_TOKENS = 1000
 MEMORY_WINDOW = 10
+CONFIG_STAT_INTERVAL = 60  # seconds between config file stat() calls
+
+# Optional shared history store (Redis); the in-process LRU mirrors it and is
+# only answered from when Redis cannot be reached
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_HISTORY_TTL = 3600  # seconds
+REDIS_KEY_PREFIX = "sess:"
+
+# Memory store limits
+MAX_MEMORY_SESSIONS = 1_000 if REDIS_URL else 10_000
+MEMORY_IDLE_TIMEOUT = 1800  # seconds
+MEMORY_JANITOR_INTERVAL = 300  # seconds
+
+# Response cache for repeated inputs with the same conversation history
+RESPONSE_CACHE_SIZE = 2048
+RESPONSE_CACHE_TTL = 300  # seconds
+
+# Input size guards (characters as a cheap token proxy)
+MAX_INPUT_CHARS = 4000
+MAX_HIST_CHARS = 20_000
+
+# "[Platform: X] " prefixes, built once per platform value
+_PLATFORM_PREFIX_CACHE: Dict[str, str] = {}
+
+
+class _LRUMemoryStore(OrderedDict):
+    """
+    Session memories ordered by last access, capped at max_sessions.
+    
+    Reads and writes move the session to the end and refresh its
+    last_seen timestamp; the least recently used session is evicted first.
+    """
+    
+    def __init__(self, max_sessions: int):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.last_seen: Dict[str, float] = {}
+    
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        self.last_seen[key] = time.monotonic()
+        return value
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        self.last_seen[key] = time.monotonic()
+        self._evict()
+    
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.last_seen.pop(key, None)
+    
+    def _evict(self):
+        while len(self) > self.max_sessions:
+            del self[next(iter(self))]
+    
+    def drop_idle(self, max_idle: float) -> int:
+        """Remove sessions not seen for more than max_idle seconds."""
+        cutoff = time.monotonic() - max_idle
+        stale = [key for key, seen in self.last_seen.items() if seen < cutoff]
+        for key in stale:
+            del self[key]
+        return len(stale)
+
+
+# Global conversation memories (session-based, LRU-bounded)
+conversation_memories: _LRUMemoryStore = _LRUMemoryStore(MAX_MEMORY_SESSIONS)
+
+# Redis client (lazy connection); None keeps history in-process only
+redis_client: Optional[aioredis.Redis] = aioredis.from_url(REDIS_URL) if REDIS_URL else None
+
+
+@functools.lru_cache(maxsize=4)
+def _load_ai_config_cached(path: str, mtime: float) -> Dict[str, Any]:
+    """
+    Parse the AI config file; cached per (path, mtime) so edits are picked up.
+    """
+    with open(path, 'rb') as f:
+        config = orjson.loads(f.read())
+    logger.info("✅ AI configuration loaded from file")
+    return config
+
+
+@functools.lru_cache(maxsize=1)
+def _config_file_mtime(path: str, bucket: int) -> float:
+    """
+    stat() the config file at most once per CONFIG_STAT_INTERVAL (bucket = time slot); 0 if missing.
+    """
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
 
 
 def load_ai_config() -> Dict[str, Any]:
@@ -38,17 +138,15 @@ def load_ai_config() -> Dict[str, Any]:
     Load AI configuration from JSON file.
     """
     try:
-        if os.path.exists(AI_CONFIG_FILE):
-            with open(AI_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                logger.info("✅ AI configuration loaded from file")
-                return config
+        mtime = _config_file_mtime(AI_CONFIG_FILE, int(time.monotonic() // CONFIG_STAT_INTERVAL))
+        if mtime:
+            return _load_ai_config_cached(AI_CONFIG_FILE, mtime)
         else:
             logger.warning("⚠️ AI config file not found, using defaults")
-            return get_default_ai_config()
+            return _DEFAULT_AI_CONFIG
     except Exception as e:
         logger.error(f"❌ Error loading AI config: {str(e)}")
-        return get_default_ai_config()
+        return _DEFAULT_AI_CONFIG
 
 
 def get_default_ai_config() -> Dict[str, Any]:
@@ -106,6 +204,10 @@ Você tem acesso ao histórico da conversa para fornecer respostas contextualiza
     }
 
 
+# Default configuration built once at import
+_DEFAULT_AI_CONFIG = get_default_ai_config()
+
+
 def get_conversation_memory(session_id: str) -> ConversationBufferWindowMemory:
     """
     Get or create conversation memory for a session.
@@ -116,16 +218,93 @@ def get_conversation_memory(session_id: str) -> ConversationBufferWindowMemory:
             return_messages=True,
             memory_key="chat_history"
         )
-        logger.info(f"🧠 Created new conversation memory for session: {session_id}")
+        logger.info("🧠 Created new conversation memory for session: %s", session_id)
     
-    return conversation_memories[session_id]
+    memory = conversation_memories[session_id]
+    
+    # The window only limits what is loaded; physically drop older messages
+    del memory.chat_memory.messages[:-2 * MEMORY_WINDOW]
+    
+    return memory
+
+
+def _encode_message(message: BaseMessage) -> bytes:
+    return orjson.dumps({"t": "h" if isinstance(message, HumanMessage) else "a", "c": message.content})
+
+
+def _decode_message(raw: bytes) -> BaseMessage:
+    data = orjson.loads(raw)
+    return HumanMessage(content=data["c"]) if data["t"] == "h" else AIMessage(content=data["c"])
+
+
+async def load_history(session_id: str) -> list:
+    """
+    Get the session's message list.
+    
+    With Redis configured the list is always read from Redis, so turns saved by
+    other replicas are seen; the in-process copy is refreshed from it and only
+    served as-is when Redis fails.
+    """
+    if redis_client is None:
+        return get_conversation_memory(session_id).chat_memory.messages
+    
+    try:
+        raw = await redis_client.lrange(REDIS_KEY_PREFIX + session_id, 0, -1)
+    except Exception as e:
+        logger.warning(f"⚠️ Error loading history from Redis, using local copy: {str(e)}")
+        return get_conversation_memory(session_id).chat_memory.messages
+    
+    messages = get_conversation_memory(session_id).chat_memory.messages
+    messages[:] = [_decode_message(item) for item in raw]
+    return messages
 
 
-def clear_conversation_memory(session_id: str) -> bool:
+async def save_turn(session_id: str, human: str, ai: str):
+    """
+    Append one human/AI exchange, keeping only the last 2 * MEMORY_WINDOW messages.
+    """
+    turn = (HumanMessage(content=human), AIMessage(content=ai))
+    
+    messages = get_conversation_memory(session_id).chat_memory.messages
+    messages.extend(turn)
+    del messages[:-2 * MEMORY_WINDOW]
+    
+    if redis_client is None:
+        return
+    
+    key = REDIS_KEY_PREFIX + session_id
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.rpush(key, *(_encode_message(m) for m in turn))
+            pipe.ltrim(key, -2 * MEMORY_WINDOW, -1)
+            pipe.expire(key, REDIS_HISTORY_TTL)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"⚠️ Error saving history to Redis: {str(e)}")
+
+
+async def memory_janitor(interval: float = MEMORY_JANITOR_INTERVAL):
+    """
+    Periodically drop conversation memories idle for longer than MEMORY_IDLE_TIMEOUT.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            dropped = conversation_memories.drop_idle(MEMORY_IDLE_TIMEOUT)
+            if dropped:
+                logger.info(f"🧹 Dropped {dropped} idle conversation memories")
+        except Exception as e:
+            logger.error(f"❌ Error in memory janitor: {str(e)}")
+
+
+async def clear_conversation_memory(session_id: str) -> bool:
     """
     Clear conversation memory for a specific session.
     """
     try:
+        if redis_client is not None:
+            await redis_client.delete(REDIS_KEY_PREFIX + session_id)
+        
         if session_id in conversation_memories:
             conversation_memories[session_id].clear()
             logger.info(f"🧹 Cleared conversation memory for session: {session_id}")
@@ -138,6 +317,21 @@ def clear_conversation_memory(session_id: str) -> bool:
         return False
 
 
+_ROLE_MAP = {HumanMessage: "User", AIMessage: "AI"}
+
+
+def _fit_history(messages: list, budget: int = MAX_HIST_CHARS) -> list:
+    """
+    Newest messages that fit in the character budget (the stored history is untouched).
+    """
+    used = 0
+    for index in range(len(messages) - 1, -1, -1):
+        used += len(messages[index].content)
+        if used > budget:
+            return messages[index + 1:]
+    return messages
+
+
 def get_conversation_summary(session_id: str) -> str:
     """
     Get a summary of the conversation for a session.
@@ -150,15 +344,12 @@ def get_conversation_summary(session_id: str) -> str:
             if not messages:
                 return "No conversation history"
             
-            # Create a simple summary
-            summary_parts = []
-            for message in messages[-6:]:  # Last 6 messages
-                if isinstance(message, HumanMessage):
-                    summary_parts.append(f"User: {message.content[:100]}...")
-                elif isinstance(message, AIMessage):
-                    summary_parts.append(f"AI: {message.content[:100]}...")
-            
-            return "\n".join(summary_parts)
+            # Create a simple summary (last 6 messages, system messages skipped)
+            return "\n".join(
+                f"{_ROLE_MAP[type(message)]}: {message.content[:100]}..."
+                for message in messages[-6:]
+                if type(message) in _ROLE_MAP
+            )
         else:
             return "No conversation found"
     except Exception as e:
@@ -171,12 +362,20 @@ class AIOrchestrator:
     Main AI orchestrator using LangChain + Gemini.
     """
     
+    __slots__ = (
+        "config", "ai_config", "system_prompt", "llm", "chain",
+        "_system_message", "_resp_cache", "_inflight_locks"
+    )
+    
     def __init__(self):
         self.config = load_ai_config()
         self.ai_config = self.config.get("ai_config", {})
         self.system_prompt = self.config.get("system_prompt", "")
         self.llm = None
         self.chain = None
+        self._system_message: Optional[SystemMessage] = None
+        self._resp_cache: TTLCache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+        self._inflight_locks: "weakref.WeakValueDictionary[tuple, asyncio.Lock]" = weakref.WeakValueDictionary()
         self._initialize_llm()
     
     def _initialize_llm(self):
@@ -216,19 +415,14 @@ class AIOrchestrator:
                 logger.error("❌ Cannot create chain: LLM not initialized")
                 return
             
-            # Create the prompt template
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", self.system_prompt),
-                MessagesPlaceholder(variable_name="chat_history"),
-                ("human", "{input}")
-            ])
+            # Static prefix first: the system prompt is a ready-made message
+            # (built once, never re-templated); only history + input vary per turn
+            self._system_message = SystemMessage(content=self.system_prompt)
             
-            # Create the chain
+            # Create the chain: the message list is assembled directly,
+            # no prompt template formatting per turn
             self.chain = (
-                RunnablePassthrough.assign(
-                    chat_history=lambda x: x["chat_history"]
-                )
-                | prompt
+                RunnableLambda(self._build_messages)
                 | self.llm
                 | StrOutputParser()
             )
@@ -239,6 +433,67 @@ class AIOrchestrator:
             logger.error(f"❌ Error creating conversation chain: {str(e)}")
             self.chain = None
     
+    def _build_messages(self, chain_input: Dict[str, Any]) -> list:
+        """
+        Build the model input: frozen system message, history, then the new human turn.
+        """
+        return [
+            self._system_message,
+            *chain_input["chat_history"],
+            HumanMessage(content=chain_input["input"])
+        ]
+    
+    @staticmethod
+    def _enhance_message(message: str, context: Optional[Dict[str, Any]]) -> str:
+        """
+        Prefix the message with its platform tag, if any.
+        """
+        platform = context.get("platform") if context else None
+        if not platform:
+            return message
+        prefix = _PLATFORM_PREFIX_CACHE.get(platform)
+        if prefix is None:
+            prefix = _PLATFORM_PREFIX_CACHE[platform] = f"[Platform: {platform.upper()}] "
+        return prefix + message
+    
+    async def stream_response(
+        self,
+        message: str,
+        session_id: str = "default",
+        context: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream the AI response chunk by chunk as Gemini generates it.
+        
+        The full response is saved to memory once the stream completes.
+        """
+        if not self.chain:
+            logger.error("❌ AI chain not available")
+            yield "Desculpe, o serviço de IA não está disponível no momento."
+            return
+        
+        messages = _fit_history(await load_history(session_id))
+        enhanced_message = self._enhance_message(message, context)[:MAX_INPUT_CHARS]
+        
+        logger.info("🤖 Streaming AI response for session: %s", session_id)
+        
+        chunks = []
+        try:
+            async for chunk in self.chain.astream({
+                "input": enhanced_message,
+                "chat_history": messages
+            }):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            logger.error(f"❌ Error streaming AI response: {str(e)}")
+            if not chunks:
+                yield "Desculpe, ocorreu um erro ao processar sua mensagem. Como posso ajudá-lo?"
+            return
+        
+        await save_turn(session_id, enhanced_message, "".join(chunks))
+        logger.info("✅ AI response streamed for session: %s", session_id)
+    
     async def generate_response(
         self, 
         message: str, 
@@ -253,39 +508,62 @@ class AIOrchestrator:
                 logger.error("❌ AI chain not available")
                 return "Desculpe, o serviço de IA não está disponível no momento."
             
-            # Get conversation memory
-            memory = get_conversation_memory(session_id)
+            # Get conversation history (Redis when configured, else in-process),
+            # limited to the history character budget
+            messages = _fit_history(await load_history(session_id))
             
-            # Add platform context to message if provided
-            enhanced_message = message
-            if context and context.get("platform"):
-                platform = context["platform"].upper()
-                enhanced_message = f"[Platform: {platform}] {message}"
+            # Add platform context to message if provided; cap oversized input
+            enhanced_message = self._enhance_message(message, context)[:MAX_INPUT_CHARS]
             
-            # Prepare input for the chain
-            chain_input = {
-                "input": enhanced_message,
-                "chat_history": memory.chat_memory.messages
-            }
-            
-            logger.info(f"🤖 Generating AI response for session: {session_id}")
+            logger.info("🤖 Generating AI response for session: %s", session_id)
             
-            # Generate response
-            response = await self.chain.ainvoke(chain_input)
+            # Generate response (history passed by reference)
+            response = await self._cached_invoke(enhanced_message, messages)
             
-            # Save to memory
-            memory.save_context(
-                {"input": enhanced_message},
-                {"output": response}
-            )
+            # Save to memory: append directly and keep only the window
+            await save_turn(session_id, enhanced_message, response)
             
-            logger.info(f"✅ AI response generated for session: {session_id}")
+            logger.info("✅ AI response generated for session: %s", session_id)
             return response
             
         except Exception as e:
             logger.error(f"❌ Error generating AI response: {str(e)}")
             return "Desculpe, ocorreu um erro ao processar sua mensagem. Como posso ajudá-lo?"
     
+    async def _cached_invoke(self, enhanced_message: str, messages: list) -> str:
+        """
+        Invoke the chain, reusing a recent response for the same input and history.
+        
+        The key hashes the whole history that is sent to Gemini (role and
+        content of every message), so a reply that depends on earlier context
+        is never served to a session whose earlier context differs.
+        Concurrent identical requests wait on one lock per key, so only the
+        first one calls Gemini (single-flight).
+        """
+        context_digest = hashlib.blake2b(
+            orjson.dumps([(m.type, str(m.content)) for m in messages]),
+            digest_size=16
+        ).digest()
+        key = (context_digest, enhanced_message)
+        
+        lock = self._inflight_locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._inflight_locks[key] = lock
+        
+        async with lock:
+            response = self._resp_cache.get(key)
+            if response is not None:
+                logger.info("♻️ Reusing cached AI response")
+                return response
+            
+            response = await self.chain.ainvoke({
+                "input": enhanced_message,
+                "chat_history": messages
+            })
+            self._resp_cache[key] = response
+            return response
+    
     def is_available(self) -> bool:
         """
         Check if AI service is available.
@@ -293,8 +571,40 @@ class AIOrchestrator:
         return self.llm is not None and self.chain is not None
 
 
-# Global AI orchestrator instance
-ai_orchestrator = AIOrchestrator()
+@functools.lru_cache(maxsize=1)
+def _api_key_configured() -> bool:
+    """
+    Whether GEMINI_API_KEY is set; read once, on first use (after .env is loaded).
+    """
+    return bool(os.getenv("GEMINI_API_KEY"))
+
+
+# Global AI orchestrator instance (created on first use)
+_orchestrator: Optional[AIOrchestrator] = None
+_orchestrator_lock = threading.Lock()
+
+
+def get_ai_orchestrator() -> AIOrchestrator:
+    """
+    Get the shared AI orchestrator, building the LLM and chain on first call.
+    """
+    global _orchestrator
+    if _orchestrator is None:
+        with _orchestrator_lock:
+            if _orchestrator is None:
+                _orchestrator = AIOrchestrator()
+    return _orchestrator
+
+
+async def warm_up_ai_orchestrator():
+    """
+    Build the AI orchestrator in a worker thread so the first request doesn't pay for it.
+    """
+    try:
+        await asyncio.to_thread(get_ai_orchestrator)
+        logger.info("✅ AI orchestrator warmed up")
+    except Exception as e:
+        logger.error(f"❌ Error warming up AI orchestrator: {str(e)}")
 
 
 # Main service functions
@@ -307,7 +617,9 @@ async def process_chat_message(
     Process chat message using LangChain + Gemini.
     """
     try:
-        logger.info(f"📨 Processing chat message for session: {session_id}")
+        logger.info("📨 Processing chat message for session: %s", session_id)
+        
+        ai_orchestrator = get_ai_orchestrator()
         
         if not ai_orchestrator.is_available():
             logger.error("❌ AI orchestrator not available")
@@ -321,12 +633,32 @@ async def process_chat_message(
         return "Desculpe, ocorreu um erro ao processar sua mensagem. Tente novamente."
 
 
+async def stream_chat_message(
+    message: str,
+    session_id: str = "default",
+    context: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[str]:
+    """
+    Stream a chat response using LangChain + Gemini.
+    """
+    ai_orchestrator = get_ai_orchestrator()
+    
+    if not ai_orchestrator.is_available():
+        logger.error("❌ AI orchestrator not available")
+        yield "Desculpe, o serviço de IA não está disponível no momento. Como posso ajudá-lo?"
+        return
+    
+    async for chunk in ai_orchestrator.stream_response(message, session_id, context):
+        yield chunk
+
+
 async def get_ai_service_status() -> Dict[str, Any]:
     """
     Get AI service status.
     """
     try:
-        api_key_configured = bool(os.getenv("GEMINI_API_KEY"))
+        api_key_configured = _api_key_configured()
+        ai_orchestrator = get_ai_orchestrator()
         ai_available = ai_orchestrator.is_available()
         
         return {
@@ -336,13 +668,15 @@ async def get_ai_service_status() -> Dict[str, Any]:
             "api_key_configured": api_key_configured,
             "model": ai_orchestrator.ai_config.get("model", DEFAULT_MODEL),
             "memory_sessions": len(conversation_memories),
+            "memory_backend": "redis" if redis_client is not None else "in_process",
             "features": [
                 "langchain_integration",
                 "conversation_memory",
                 "google_gemini_api",
                 "session_management",
                 "context_awareness",
-                "platform_adaptation"
+                "platform_adaptation",
+                "response_streaming"
             ],
             "configuration_notes": [
                 "Set GEMINI_API_KEY environment variable",
@@ -13,7 +13,7 @@ from app.services.ai_chain import (
     clear_conversation_memory,
     get_conversation_summary,
     get_ai_service_status,
-    ai_orchestrator,
+    get_ai_orchestrator,
 )
 
 # Configure logging
@@ -5,22 +5,240 @@ This service communicates with the dedicated `whatsapp_bot` container over HTTP.
 It handles message sending, status checking, and connection management.
 Clean service focused only on message dispatch - no business logic.
 """
-import requests
+import httpx
+import orjson
 import logging
 import asyncio
 import os
-from typing import Dict, Any
+import time
+import random
+import weakref
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Set, Tuple
+
+from app.utils.phone import normalize_br_phone
 
 logger = logging.getLogger(__name__)
-    
+
+# Micro-batch de envios: o worker agrupa o que estiver na fila (até SEND_BATCH_MAX)
+SEND_BATCH_MAX = 50
+
+# Endpoint de lote da VM (ex.: "/send-messages"); vazio = envios individuais em paralelo
+SEND_BATCH_ENDPOINT = os.getenv("WHATSAPP_BOT_BATCH_ENDPOINT", "")
+
+# Máximo de POSTs simultâneos para a VM; o excedente espera aqui em vez de
+# disputar o pool do httpx e estourar timeouts
+SEND_MAX_INFLIGHT = int(os.getenv("WHATSAPP_MAX_INFLIGHT", "20"))
+
+# Janela em que chamadas de status compartilham um único GET /health; o jitter
+# espalha as renovações para que pollers diferentes não batam na VM juntos
+HEALTH_CACHE_TTL = 5.0
+HEALTH_CACHE_JITTER = 0.5
+
+# Circuit breaker: após N falhas de rede seguidas, recusa envios durante o cooldown;
+# se o envio de teste (meio-aberto) falhar, novo teste a cada CIRCUIT_PROBE_INTERVAL
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30.0
+CIRCUIT_PROBE_INTERVAL = 5.0
+
+# Backoff das tentativas de conexão: min(cap, base * 2**tentativa) + jitter
+CONNECT_BACKOFF_BASE = 0.5
+CONNECT_BACKOFF_CAP = 8.0
+CONNECT_BACKOFF_JITTER = 0.25
+
+# Timeouts por tipo de chamada (aplicados pelo próprio httpx, sem wait_for)
+_SEND_TIMEOUT = httpx.Timeout(10.0, connect=5.0, read=15.0)
+_HEALTH_TIMEOUT = httpx.Timeout(5.0)
+_CONNECT_PROBE_TIMEOUT = httpx.Timeout(8.0)
+
+# Cabeçalhos fixos de todas as chamadas à VM (corpo serializado com orjson).
+# Ficam só como default do client: as chamadas não repassam headers, então o
+# httpx não precisa mesclar um segundo dicionário a cada requisição.
+_JSON_HEADERS = MappingProxyType({"Content-Type": "application/json", "Accept": "application/json"})
+
+
+def _is_vm_success(result: Dict[str, Any]) -> bool:
+    """A VM sinaliza sucesso com success=true ou status="success"."""
+    success = result.get("success")
+    if success is not None:
+        return bool(success)
+    return result.get("status") == "success"
+
+
 class BaileysWhatsAppService:
+    __slots__ = (
+        "base_url", "_url_qr", "timeout", "max_retries", "initialized", "connection_healthy", "batch_endpoint",
+        "_client", "_send_queue", "_send_worker", "_dispatch_tasks", "_send_sem",
+        "_health_cache", "_health_lock",
+        "_failures", "_open_until", "_probe_in_flight"
+    )
+
     def __init__(self, base_url: str = None):
         # ✅ ENDPOINT CORRETO DA VM EXTERNA
         self.base_url = base_url or os.getenv("WHATSAPP_BOT_URL", "http://34.27.244.115:8081")
+        # Rotas relativas ao base_url do client; só a URL pública do QR é absoluta
+        self._url_qr = f"{self.base_url}/qr"
         self.timeout = 10
-        self.max_retries = 2
+        self.max_retries = 4
         self.initialized = False
         self.connection_healthy = False
+        self.batch_endpoint = SEND_BATCH_ENDPOINT
+        self._client: Optional[httpx.AsyncClient] = None
+        self._send_queue: asyncio.Queue = asyncio.Queue()
+        self._send_worker: Optional[asyncio.Task] = None
+        self._dispatch_tasks: Set[asyncio.Task] = set()
+        self._send_sem = asyncio.Semaphore(SEND_MAX_INFLIGHT)
+        self._health_cache: Optional[Tuple[float, Any]] = None  # (expira_em, resultado)
+        self._health_lock = asyncio.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+        self._probe_in_flight = False
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Cliente HTTP persistente (keep-alive) reutilizado em todas as chamadas à VM."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=True,  # negociado via ALPN em https; http:// segue em HTTP/1.1 keep-alive
+                timeout=httpx.Timeout(self.timeout, connect=8.0),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+                headers=_JSON_HEADERS
+            )
+        return self._client
+
+    def _ensure_send_worker(self):
+        """Inicia o worker da fila de envio no event loop atual (lazy)."""
+        if self._send_worker is None or self._send_worker.done():
+            self._send_worker = asyncio.create_task(self._drain_loop())
+
+    async def _drain_loop(self):
+        """Drena a fila em lotes e dispara os envios de cada lote juntos."""
+        while True:
+            batch = [await self._send_queue.get()]
+            while len(batch) < SEND_BATCH_MAX:
+                try:
+                    batch.append(self._send_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            if len(batch) > 1:
+                logger.debug("📦 Lote de %s mensagens para a VM", len(batch))
+
+            # Cada lote segue em sua própria task, sem bloquear a drenagem do próximo
+            task = asyncio.create_task(self._dispatch_batch(batch))
+            self._dispatch_tasks.add(task)
+            task.add_done_callback(self._dispatch_tasks.discard)
+
+    async def _dispatch_batch(self, batch):
+        try:
+            results = None
+            if self.batch_endpoint and len(batch) > 1:
+                results = await self._post_batch(batch)
+
+            # Sem endpoint de lote (ou resposta inesperada): envios individuais em paralelo
+            if results is None:
+                results = await asyncio.gather(
+                    *(self._post_message(phone, message) for phone, message, _ in batch),
+                    return_exceptions=True
+                )
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            # Nenhum chamador fica esperando para sempre: o que sobrou pendente
+            # conta como falha (e libera um envio de teste do breaker preso no lote)
+            pending = [future for _, _, future in batch if not future.done()]
+            if pending:
+                self._record_failure()
+                for future in pending:
+                    future.set_result(False)
+
+    async def _post_batch(self, batch) -> Optional[list]:
+        """
+        Envia o lote inteiro em um único POST para o endpoint de lote da VM.
+
+        Retorna um bool por mensagem, ou None (endpoint inexistente) para cair
+        nos envios individuais.
+        """
+        body = orjson.dumps({
+            "messages": [{"phone_number": phone, "message": message} for phone, message, _ in batch]
+        })
+        try:
+            async with self._send_sem:
+                response = await self._get_client().post(
+                    self.batch_endpoint, content=body, timeout=_SEND_TIMEOUT
+                )
+        except httpx.HTTPError as e:
+            # Timeout, conexão, leitura/escrita, protocolo ou pool: o lote inteiro falha
+            logger.error("🔌 Falha no envio em lote para a VM (%s): %s", type(e).__name__, e)
+            self.connection_healthy = False
+            self._record_failure()
+            return [False] * len(batch)
+        except Exception as e:
+            logger.exception("❌ ERRO INESPERADO no envio em lote (%s): %s", type(e).__name__, e)
+            self.connection_healthy = False
+            self._record_failure()
+            return [False] * len(batch)
+
+        if response.status_code in (404, 405):
+            logger.warning("⚠️ VM sem endpoint de lote %s - usando envios individuais", self.batch_endpoint)
+            self.batch_endpoint = ""
+            return None
+
+        # Daqui em diante a VM pode já ter enviado: nunca reenviar individualmente
+        if response.status_code >= 500:
+            self._record_failure()
+        else:
+            self._record_success()
+
+        if response.status_code != 200:
+            logger.error("❌ VM RETORNOU ERRO HTTP %s no envio em lote", response.status_code)
+            return [False] * len(batch)
+
+        try:
+            items = orjson.loads(response.content).get("results")
+        except Exception:
+            items = None
+        if not isinstance(items, list) or len(items) != len(batch):
+            # ✅ Mesmo critério do envio individual: status 200 = sucesso parcial
+            logger.warning("⚠️ Status 200 com resposta de lote inesperada - considerando sucesso parcial")
+            self.connection_healthy = True
+            return [True] * len(batch)
+
+        self.connection_healthy = True
+        logger.info("✅ Lote de %s mensagens enviado", len(batch))
+        return [isinstance(item, dict) and _is_vm_success(item) for item in items]
+
+    def _circuit_allows(self) -> bool:
+        """Fechado: libera. Aberto: recusa até o cooldown. Meio-aberto: libera um único envio de teste."""
+        if self._failures < CIRCUIT_FAILURE_THRESHOLD:
+            return True
+        if time.monotonic() < self._open_until or self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def _record_success(self):
+        if self._failures >= CIRCUIT_FAILURE_THRESHOLD:
+            logger.info("✅ Circuit breaker fechado - VM Baileys voltou a responder")
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def _record_failure(self):
+        was_probe = self._probe_in_flight
+        self._failures += 1
+        self._probe_in_flight = False
+        if self._failures == CIRCUIT_FAILURE_THRESHOLD:
+            # Transição fechado -> aberto: único WARN até a VM voltar
+            self._open_until = time.monotonic() + CIRCUIT_COOLDOWN
+            logger.warning("🚧 Circuit breaker aberto por %.0fs após %s falhas", CIRCUIT_COOLDOWN, self._failures)
+        elif was_probe and self._failures > CIRCUIT_FAILURE_THRESHOLD:
+            # Envio de teste falhou: continua aberto, próximo teste em poucos segundos
+            self._open_until = time.monotonic() + CIRCUIT_PROBE_INTERVAL
 
     async def initialize(self):
         """Initialize connection to WhatsApp bot service."""
@@ -29,53 +247,46 @@ class BaileysWhatsAppService:
             return True
 
         try:
-            logger.info(f"🔌 Inicializando conexão com VM Baileys: {self.base_url}")
+            logger.info("🔌 Inicializando conexão com VM Baileys: %s", self.base_url)
+            self._get_client()
 
-            try:
-                await asyncio.wait_for(
-                    self._attempt_connection(),
-                    timeout=20.0
-                )
+            if await self._attempt_connection():
                 logger.info("✅ Conexão com VM Baileys estabelecida")
                 return True
-            except asyncio.TimeoutError:
-                logger.warning("⏰ Timeout na inicialização da VM Baileys")
-                self.initialized = False
-                return False
+
+            logger.warning("⚠️ VM Baileys indisponível na inicialização")
+            self.initialized = False
+            return False
 
         except Exception as e:
-            logger.error(f"❌ Erro ao inicializar VM Baileys: {str(e)}")
+            logger.error("❌ Erro ao inicializar VM Baileys: %s", e)
             self.initialized = False
             return False
 
     async def _attempt_connection(self):
-        """Attempt connection with retries."""
+        """Attempt connection with retries (reaproveita o probe de _get_health)."""
         for attempt in range(self.max_retries):
             try:
-                loop = asyncio.get_event_loop()
-                
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: requests.get(
-                        f"{self.base_url}/health", 
-                        timeout=8
-                    )
-                )
-                
-                if response.status_code == 200:
+                status_code, _ = await self._get_health(timeout=_CONNECT_PROBE_TIMEOUT, fresh=True)
+
+                if status_code == 200:
                     logger.info("✅ VM Baileys está acessível")
                     self.initialized = True
                     self.connection_healthy = True
                     return True
-                else:
-                    logger.warning(f"⚠️ VM retornou status {response.status_code}")
-                    
+                logger.warning("⚠️ VM retornou status %s", status_code)
+
             except Exception as e:
-                if attempt < self.max_retries - 1:
-                    logger.warning(f"⚠️ Tentativa {attempt + 1} falhou, tentando novamente...")
-                    await asyncio.sleep(2)
-                else:
-                    logger.error(f"❌ Falha após {self.max_retries} tentativas: {str(e)}")
+                if attempt == self.max_retries - 1:
+                    logger.error("❌ Falha após %s tentativas: %s", self.max_retries, e)
+                    break
+                logger.warning("⚠️ Tentativa %s falhou, tentando novamente...", attempt + 1)
+
+            if attempt < self.max_retries - 1:
+                await asyncio.sleep(
+                    min(CONNECT_BACKOFF_CAP, CONNECT_BACKOFF_BASE * (2 ** attempt))
+                    + random.uniform(0, CONNECT_BACKOFF_JITTER)
+                )
 
         return False
 
@@ -85,6 +296,20 @@ class BaileysWhatsAppService:
         self.initialized = False
         self.connection_healthy = False
 
+        if self._send_worker is not None:
+            self._send_worker.cancel()
+            self._send_worker = None
+        if self._dispatch_tasks:
+            await asyncio.gather(*self._dispatch_tasks, return_exceptions=True)
+        while not self._send_queue.empty():
+            _, _, future = self._send_queue.get_nowait()
+            if not future.done():
+                future.set_result(False)
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     async def send_whatsapp_message(self, phone_number: str, message: str) -> bool:
         """
         ✅ ENVIO DE MENSAGEM WHATSAPP CORRIGIDO
@@ -93,118 +318,153 @@ class BaileysWhatsAppService:
         Corrigido: formato do número, endpoint, logs detalhados
         """
         try:
-            # ✅ LIMPEZA DO NÚMERO - Remover todos os caracteres não numéricos
-            clean_phone = ''.join(filter(str.isdigit, phone_number))
-            
-            # ✅ ADICIONAR CÓDIGO DO PAÍS SE NECESSÁRIO
-            if not clean_phone.startswith("55"):
-                clean_phone = f"55{clean_phone}"
+            # ✅ LIMPEZA DO NÚMERO + CÓDIGO DO PAÍS (55) SE NECESSÁRIO
+            clean_phone = normalize_br_phone(phone_number)
             
             # ✅ VALIDAÇÃO BÁSICA DO NÚMERO
-            if len(clean_phone) < 12 or len(clean_phone) > 14:
-                logger.error(f"❌ Número inválido: {clean_phone} (tamanho: {len(clean_phone)})")
+            if not 12 <= len(clean_phone) <= 14:
+                logger.error("❌ Número inválido: %s (tamanho: %s)", clean_phone, len(clean_phone))
+                return False
+            
+            # ✅ CIRCUIT BREAKER: VM fora do ar, falhar imediatamente
+            if not self._circuit_allows():
+                logger.debug("🚧 Circuit breaker aberto - envio recusado sem chamar a VM")
                 return False
             
+            # ✅ ENFILEIRAR PARA O WORKER DE LOTES
+            self._ensure_send_worker()
+            future = asyncio.get_running_loop().create_future()
+            await self._send_queue.put((clean_phone, message, future))
+            return await future
+
+        except Exception as e:
+            # logger.exception anexa o traceback no próprio registro (formatado só se emitido)
+            logger.exception("❌ ERRO INESPERADO ao enviar WhatsApp (%s): %s", type(e).__name__, e)
+            return False
+
+    async def _post_message(self, clean_phone: str, message: str) -> bool:
+        """Envia uma mensagem já normalizada para a VM e interpreta a resposta."""
+        try:
             # ✅ PAYLOAD CORRETO PARA A VM (sem @s.whatsapp.net)
             payload = {
                 "phone_number": clean_phone,
                 "message": message
             }
             
-            # ✅ HEADERS CORRETOS
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            }
-            
-            # ✅ LOGS DETALHADOS ANTES DO ENVIO
-            logger.info(f"📤 ENVIANDO MENSAGEM WHATSAPP")
-            logger.info(f"📱 Número limpo: {clean_phone}")
-            logger.info(f"💬 Mensagem: {message[:100]}{'...' if len(message) > 100 else ''}")
-            logger.info(f"🔗 Endpoint: {self.base_url}/send-message")
-            logger.info(f"📦 Payload: {payload}")
-            logger.info(f"📋 Headers: {headers}")
-
-            # ✅ ENVIO ASSÍNCRONO COM TIMEOUT
-            loop = asyncio.get_event_loop()
-            response = await asyncio.wait_for(
-                loop.run_in_executor(
-                    None,
-                    lambda: requests.post(
-                        f"{self.base_url}/send-message",
-                        json=payload,
-                        timeout=self.timeout,
-                        headers=headers
-                    )
-                ),
-                timeout=15.0
-            )
+            # ✅ LOGS DETALHADOS ANTES DO ENVIO (somente em DEBUG)
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug("📤 ENVIANDO MENSAGEM WHATSAPP")
+                logger.debug("📱 Número limpo: %s", clean_phone)
+                logger.debug("💬 Mensagem: %s%s", message[:100], "..." if len(message) > 100 else "")
+                logger.debug("🔗 Endpoint: %s/send-message", self.base_url)
+                logger.debug("📦 Payload: %s", payload)
+
+            # ✅ ENVIO ASSÍNCRONO (timeout nativo do httpx, conexão reutilizada,
+            # no máximo SEND_MAX_INFLIGHT POSTs em voo)
+            async with self._send_sem:
+                response = await self._get_client().post(
+                    "/send-message",
+                    content=orjson.dumps(payload),
+                    timeout=_SEND_TIMEOUT
+                )
 
-            # ✅ LOGS DETALHADOS DA RESPOSTA
-            logger.info(f"📊 RESPOSTA DA VM:")
-            logger.info(f"   Status: {response.status_code}")
-            logger.info(f"   Headers: {dict(response.headers)}")
-            logger.info(f"   Body: {response.text}")
+            # ✅ LOGS DETALHADOS DA RESPOSTA (somente em DEBUG)
+            if debug:
+                logger.debug("📊 RESPOSTA DA VM:")
+                logger.debug("   Status: %s", response.status_code)
+                logger.debug("   Headers: %r", response.headers)
+                logger.debug("   Body: %s", response.text)
+            
+            # VM respondeu: só erro 5xx conta como falha para o circuit breaker
+            if response.status_code >= 500:
+                self._record_failure()
+            else:
+                self._record_success()
             
             # ✅ PROCESSAMENTO DA RESPOSTA
             if response.status_code == 200:
+                # Parse direto dos bytes; o corpo nunca é decodificado para str fora do DEBUG
                 try:
-                    result = response.json()
-                    logger.info(f"📋 JSON parseado: {result}")
-                    
-                    if result.get("success") or result.get("status") == "success":
-                        logger.info(f"✅ MENSAGEM ENVIADA COM SUCESSO para {clean_phone}")
-                        self.connection_healthy = True
-                        return True
-                    else:
-                        error_msg = result.get('error', result.get('message', 'Erro desconhecido'))
-                        logger.error(f"❌ VM REJEITOU MENSAGEM: {error_msg}")
-                        return False
-                except Exception as json_error:
-                    logger.error(f"❌ ERRO AO PARSEAR JSON: {str(json_error)}")
-                    logger.error(f"📄 Resposta raw: '{response.text}'")
-                    # ✅ Se status 200 mas JSON inválido, considerar sucesso parcial
+                    result = orjson.loads(response.content)
+                except ValueError:
+                    result = None
+                if not isinstance(result, dict):
+                    # ✅ Status 200 sem JSON utilizável: o status basta para considerar enviado
                     self.connection_healthy = True
-                    logger.warning("⚠️ Status 200 com JSON inválido - considerando sucesso parcial")
-                    return True  # Assumir que foi enviado
+                    logger.warning("⚠️ Status 200 sem JSON válido - considerando enviado para %s", clean_phone)
+                    if debug:
+                        logger.debug("📄 Resposta raw: '%s'", response.text)
+                    return True
+
+                if debug:
+                    logger.debug("📋 JSON parseado: %s", result)
+
+                if _is_vm_success(result):
+                    logger.info("✅ MENSAGEM ENVIADA COM SUCESSO para %s", clean_phone)
+                    self.connection_healthy = True
+                    return True
+                error_msg = result.get("error") or result.get("message") or "Erro desconhecido"
+                logger.error("❌ VM REJEITOU MENSAGEM: %s", error_msg)
+                return False
             else:
-                logger.error(f"❌ VM RETORNOU ERRO HTTP {response.status_code}")
-                logger.error(f"📄 Resposta de erro: {response.text}")
+                logger.error("❌ VM RETORNOU ERRO HTTP %s", response.status_code)
+                logger.error("📄 Resposta de erro: %s", response.text)
                 return False
 
-        except asyncio.TimeoutError:
+        except httpx.TimeoutException:
             logger.error("⏰ TIMEOUT ao enviar mensagem WhatsApp para VM")
             self.connection_healthy = False
+            self._record_failure()
             return False
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             logger.error("🔌 FALHA DE CONEXÃO com a VM Baileys")
             self.connection_healthy = False
+            self._record_failure()
             return False
         except Exception as e:
-            logger.error(f"❌ ERRO INESPERADO ao enviar WhatsApp: {str(e)}")
-            logger.error(f"   Tipo do erro: {type(e).__name__}")
-            import traceback
-            logger.error(f"   Traceback: {traceback.format_exc()}")
+            self._record_failure()
+            # logger.exception anexa o traceback no próprio registro (formatado só se emitido)
+            logger.exception("❌ ERRO INESPERADO ao enviar WhatsApp (%s): %s", type(e).__name__, e)
             return False
 
+    async def _get_health(
+        self, timeout: httpx.Timeout = _HEALTH_TIMEOUT, fresh: bool = False
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        GET /health com cache curto (single-flight).
+
+        Único ponto que consulta /health: usado pelo status, pelo health check
+        e pelas tentativas de conexão da inicialização (fresh=True ignora o
+        cache, mas o resultado novo continua sendo armazenado).
+
+        Retorna (status_code, json). Falhas também ficam em cache pela mesma
+        janela para que uma VM fora do ar não receba um probe por chamada.
+        """
+        cached = self._health_cache
+        if fresh or cached is None or time.monotonic() >= cached[0]:
+            async with self._health_lock:
+                cached = self._health_cache
+                if fresh or cached is None or time.monotonic() >= cached[0]:
+                    try:
+                        response = await self._get_client().get("/health", timeout=timeout)
+                        data = orjson.loads(response.content) if response.status_code == 200 else {}
+                        result: Any = (response.status_code, data)
+                    except Exception as e:
+                        result = e
+                    expires_at = time.monotonic() + HEALTH_CACHE_TTL + random.uniform(0, HEALTH_CACHE_JITTER)
+                    cached = self._health_cache = (expires_at, result)
+
+        if isinstance(cached[1], Exception):
+            raise cached[1]
+        return cached[1]
+
     async def get_connection_status(self) -> Dict[str, Any]:
         """Get connection status from whatsapp_bot API."""
         try:
-            loop = asyncio.get_event_loop()
-            
-            response = await asyncio.wait_for(
-                loop.run_in_executor(
-                    None,
-                    lambda: requests.get(
-                        f"{self.base_url}/health",
-                        timeout=5
-                    )
-                ),
-                timeout=8.0
-            )
+            status_code, data = await self._get_health()
 
-            if response.status_code == 200:
-                data = response.json()
+            if status_code == 200:
                 self.connection_healthy = True
                 return {
                     "status": "connected" if data.get("isConnected") else "disconnected",
@@ -213,7 +473,7 @@ class BaileysWhatsAppService:
                     "has_qr": data.get("hasQR", False),
                     "phone_number": data.get("phoneNumber", "unknown"),
                     "timestamp": data.get("timestamp"),
-                    "qr_url": f"{self.base_url}/qr" if not data.get("isConnected") else None,
+                    "qr_url": self._url_qr if not data.get("isConnected") else None,
                     "service_healthy": True
                 }
             else:
@@ -225,7 +485,7 @@ class BaileysWhatsAppService:
                     "service_healthy": False
                 }
 
-        except asyncio.TimeoutError:
+        except httpx.TimeoutException:
             logger.warning("⏰ Timeout no status check da VM")
             self.connection_healthy = False
             return {
@@ -235,7 +495,7 @@ class BaileysWhatsAppService:
                 "service_healthy": False,
                 "error": "Status check timed out"
             }
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             self.connection_healthy = False
             return {
                 "status": "service_unavailable", 
@@ -245,7 +505,7 @@ class BaileysWhatsAppService:
                 "error": "Service unavailable"
             }
         except Exception as e:
-            logger.error(f"❌ Erro ao obter status da VM: {str(e)}")
+            logger.error("❌ Erro ao obter status da VM: %s", e)
             self.connection_healthy = False
             return {
                 "status": "error", 
@@ -258,16 +518,9 @@ class BaileysWhatsAppService:
     async def check_health(self) -> Dict[str, Any]:
         """Quick health check of WhatsApp bot service."""
         try:
-            loop = asyncio.get_event_loop()
-            response = await asyncio.wait_for(
-                loop.run_in_executor(
-                    None,
-                    lambda: requests.get(f"{self.base_url}/health", timeout=5)
-                ),
-                timeout=7.0
-            )
+            status_code, data = await self._get_health()
             
-            result = response.json() if response.status_code == 200 else {"status": "unhealthy"}
+            result = dict(data) if status_code == 200 else {"status": "unhealthy"}
             self.connection_healthy = result.get("status") == "healthy"
             return result
             
@@ -279,17 +532,75 @@ class BaileysWhatsAppService:
         """Quick health check without async call."""
         return self.connection_healthy and self.initialized
 
-# Global instance
+# Global instance (fica com o primeiro event loop que usar get_baileys_service)
 baileys_service = BaileysWhatsAppService()
 
+# Client, fila, worker e locks pertencem a um event loop: uma instância por loop,
+# cada uma com sua inicialização disparada uma única vez
+_services: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[BaileysWhatsAppService, asyncio.Task]]" = (
+    weakref.WeakKeyDictionary()
+)
+_default_bound = False
+
+
+async def get_baileys_service() -> BaileysWhatsAppService:
+    """Instância do loop atual, inicializada (lazy) no primeiro uso."""
+    global _default_bound
+    loop = asyncio.get_running_loop()
+    entry = _services.get(loop)
+    if entry is None:
+        if _default_bound:
+            service = BaileysWhatsAppService(baileys_service.base_url)
+        else:
+            service, _default_bound = baileys_service, True
+        entry = _services[loop] = (service, loop.create_task(service.initialize()))
+
+    service, init_task = entry
+    if not init_task.done():
+        # shield: cancelar quem espera não cancela a inicialização compartilhada
+        await asyncio.shield(init_task)
+    return service
+
+
+async def cleanup_baileys_services():
+    """
+    Encerra todas as instâncias criadas por get_baileys_service (uma por loop).
+
+    Client, fila e worker pertencem ao loop de cada instância, então cada
+    cleanup roda no próprio loop; loops já fechados não têm mais o que liberar.
+    """
+    global _default_bound
+    current = asyncio.get_running_loop()
+    # Nenhum loop chegou a usar o serviço: só a instância global existe
+    cleanups = [] if _default_bound else [baileys_service.cleanup()]
+    for loop, (service, init_task) in list(_services.items()):
+        if loop is current:
+            if not init_task.done():
+                init_task.cancel()
+            cleanups.append(service.cleanup())
+        elif loop.is_running():
+            cleanups.append(asyncio.wrap_future(asyncio.run_coroutine_threadsafe(service.cleanup(), loop)))
+        else:
+            continue
+        del _services[loop]
+        if service is baileys_service:
+            _default_bound = False
+
+    for result in await asyncio.gather(*cleanups, return_exceptions=True):
+        if isinstance(result, BaseException):
+            logger.warning("⚠️ Falha ao encerrar instância do Baileys: %s", result)
+
+
 # Simple wrappers for backward compatibility
 async def send_baileys_message(phone_number: str, message: str) -> bool:
-    """Wrapper function - delegates to baileys_service."""
-    return await baileys_service.send_whatsapp_message(phone_number, message)
+    """Wrapper function - delegates to the loop's baileys service."""
+    service = await get_baileys_service()
+    return await service.send_whatsapp_message(phone_number, message)
 
 async def get_baileys_status() -> Dict[str, Any]:
-    """Wrapper function - delegates to baileys_service."""
-    return await baileys_service.get_connection_status()
+    """Wrapper function - delegates to the loop's baileys service."""
+    service = await get_baileys_service()
+    return await service.get_connection_status()
 
 
 
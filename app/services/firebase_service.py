@@ -9,10 +9,10 @@ NOVO FLUXO: 5 steps de qualificação (apenas Penal e Saúde/Liminares)
 """
 
 import os
-import json
 import logging
 from typing import Dict, Any, Optional
 from datetime import datetime
+import orjson
 import firebase_admin
 from firebase_admin import credentials, firestore
 from fastapi import HTTPException, status
@@ -41,7 +41,7 @@ def initialize_firebase():
             raise ValueError("Variável de ambiente FIREBASE_KEY não encontrada.")
 
         # Converte o JSON que veio da env em dict
-        firebase_credentials = json.loads(firebase_key)
+        firebase_credentials = orjson.loads(firebase_key)
         cred = credentials.Certificate(firebase_credentials)
 
         logger.info("🔥 Inicializando Firebase com credenciais do Secret Manager")
@@ -211,17 +211,19 @@ async def save_lead_data(lead_data: Dict[str, Any]) -> str:
         db = get_firestore_client()
 
         # NOVO FLUXO: Estrutura aprimorada para leads qualificados
+        # (dict direto para o SDK: sem serialização JSON no caminho do lead)
+        now = datetime.now()
         lead_doc = {
             "answers": lead_data.get("answers", []),
-            "timestamp": datetime.now(),
+            "timestamp": now,
             "status": "qualified_hot",  # NOVO FLUXO: leads são qualificados
             "source": "novo_fluxo_qualificacao",
             "flow_type": "lead_qualification",
             "areas_available": ["Direito Penal", "Saúde/Liminares"],
             "lead_temperature": "hot",
             "urgency": "high",
-            "created_at": datetime.now(),
-            "updated_at": datetime.now(),
+            "created_at": now,
+            "updated_at": now,
         }
 
         # Adiciona resumo se disponível
@@ -8,6 +8,7 @@ error handling for the Gemini generative AI service.
 
 import os
 import httpx
+import orjson
 import logging
 from typing import Dict, Any
 from fastapi import HTTPException, status
@@ -74,7 +75,7 @@ async def generate_gemini_response(user_message: str) -> str:
         async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
             response = await client.post(
                 url=url,
-                json=payload,
+                content=orjson.dumps(payload),  # bytes prontos, sem json.dumps + encode
                 headers=headers
             )
             
@@ -82,7 +83,7 @@ async def generate_gemini_response(user_message: str) -> str:
             if response.status_code != 200:
                 error_detail = f"Gemini API request failed with status {response.status_code}"
                 try:
-                    error_response = response.json()
+                    error_response = orjson.loads(response.content)
                     if "error" in error_response:
                         error_detail += f": {error_response['error'].get('message', 'Unknown error')}"
                 except Exception:
@@ -95,7 +96,7 @@ async def generate_gemini_response(user_message: str) -> str:
                 )
             
             # Parse the response
-            response_data = response.json()
+            response_data = orjson.loads(response.content)
             
             # Extract the generated text from the response
             try:
@@ -5,24 +5,31 @@ Service for managing lead assignments to lawyers with clickable links.
 Handles assignment logic, Firebase storage, and WhatsApp notifications.
 """
 
+import asyncio
 import logging
 import os
 import uuid
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timezone
 
 from app.services.firebase_service import get_firestore_client
-from app.services.baileys_service import baileys_service
-from app.config.lawyers import get_lawyers_for_notification, format_lawyer_phone_for_whatsapp
+from app.services.baileys_service import send_baileys_message
+from app.config.lawyers import get_lawyers_for_notification
+from app.utils.phone import normalize_br_phone
 
 logger = logging.getLogger(__name__)
 
+# Máximo de envios simultâneos ao notificar advogados (o serviço Baileys ainda
+# agrupa os envios concorrentes em lotes para a VM)
+LAWYER_NOTIFY_CONCURRENCY = 10
+
 
 class LeadAssignmentService:
     """Service for managing lead assignments to lawyers."""
     
     def __init__(self):
         self.base_url = os.getenv("BASE_URL", "https://law-firm-backend-936902782519-936902782519.us-central1.run.app")
+        self._notify_sem = asyncio.Semaphore(LAWYER_NOTIFY_CONCURRENCY)
     
     async def create_lead_with_assignment_links(
         self,
@@ -206,9 +213,7 @@ class LeadAssignmentService:
     ) -> str:
         """Generate WhatsApp URL with pre-filled message."""
         # Clean phone number for WhatsApp URL
-        clean_phone = ''.join(filter(str.isdigit, lead_phone))
-        if not clean_phone.startswith("55"):
-            clean_phone = f"55{clean_phone}"
+        clean_phone = normalize_br_phone(lead_phone)
         
         # Create message
         message = f"Olá {lead_name}, Eu sou {lawyer_name} e eu vou cuidar do seu caso {category}. Situação: {situation[:100]}{'...' if len(situation) > 100 else ''}"
@@ -260,10 +265,8 @@ class LeadAssignmentService:
         """Send assignment notifications to all lawyers with clickable links."""
         try:
             lawyers = get_lawyers_for_notification()
-            results = []
-            successful_notifications = 0
             
-            for lawyer in lawyers:
+            async def notify(lawyer: Dict[str, Any]) -> Dict[str, Any]:
                 try:
                     lawyer_id = lawyer["phone"]  # Using phone as lawyer ID
                     assignment_link = f"{self.base_url}/api/v1/leads/{lead_id}/assign/{lawyer_id}"
@@ -280,46 +283,45 @@ Situação: {situation[:200]}{'...' if len(situation) > 200 else ''}
 {assignment_link}
 """
                     
-                    # Format lawyer phone for WhatsApp
-                    whatsapp_number = format_lawyer_phone_for_whatsapp(lawyer["phone"])
-                    
                     # Send notification
                     # ✅ CORREÇÃO: Extrair apenas o número limpo
-                    clean_phone_for_vm = ''.join(filter(str.isdigit, lawyer["phone"]))
-                    if not clean_phone_for_vm.startswith("55"):
-                        clean_phone_for_vm = f"55{clean_phone_for_vm}"
+                    clean_phone_for_vm = normalize_br_phone(lawyer["phone"])
                     
                     logger.info(f"📤 Enviando notificação para advogado {lawyer['name']}")
                     logger.info(f"📱 Número limpo: {clean_phone_for_vm}")
                     
-                    success = await baileys_service.send_whatsapp_message(
-                        clean_phone_for_vm,  # ✅ Apenas número limpo
-                        notification_message
-                    )
+                    async with self._notify_sem:
+                        success = await send_baileys_message(
+                            clean_phone_for_vm,  # ✅ Apenas número limpo
+                            notification_message
+                        )
+                    
+                    if success:
+                        logger.info(f"✅ Assignment notification sent to {lawyer['name']}")
+                    else:
+                        logger.error(f"❌ Failed to send notification to {lawyer['name']}")
                     
-                    results.append({
+                    return {
                         "lawyer": lawyer["name"],
                         "phone": lawyer["phone"],
                         "success": success,
                         "assignment_link": assignment_link,
                         "timestamp": datetime.now(timezone.utc).isoformat()
-                    })
-                    
-                    if success:
-                        successful_notifications += 1
-                        logger.info(f"✅ Assignment notification sent to {lawyer['name']}")
-                    else:
-                        logger.error(f"❌ Failed to send notification to {lawyer['name']}")
+                    }
                     
                 except Exception as lawyer_error:
                     logger.error(f"❌ Error sending notification to {lawyer.get('name', 'Unknown')}: {str(lawyer_error)}")
-                    results.append({
+                    return {
                         "lawyer": lawyer.get("name", "Unknown"),
                         "phone": lawyer.get("phone", "Unknown"),
                         "success": False,
                         "error": str(lawyer_error),
                         "timestamp": datetime.now(timezone.utc).isoformat()
-                    })
+                    }
+            
+            # ✅ TODOS OS ADVOGADOS EM PARALELO: tempo total = envio mais lento
+            results = list(await asyncio.gather(*(notify(lawyer) for lawyer in lawyers)))
+            successful_notifications = sum(1 for result in results if result["success"])
             
             return {
                 "success": successful_notifications > 0,
@@ -347,11 +349,9 @@ Situação: {situation[:200]}{'...' if len(situation) > 200 else ''}
             confirmation_message = f"✅ Você assumiu com sucesso este cliente: {lead_name}\n\nLead ID: {lead_id}\n\nPor favor, entre em contato com o cliente o quanto antes."
             
             # ✅ CORREÇÃO: Extrair apenas o número limpo
-            clean_phone_for_vm = ''.join(filter(str.isdigit, lawyer_info["phone"]))
-            if not clean_phone_for_vm.startswith("55"):
-                clean_phone_for_vm = f"55{clean_phone_for_vm}"
+            clean_phone_for_vm = normalize_br_phone(lawyer_info["phone"])
             
-            success = await baileys_service.send_whatsapp_message(
+            success = await send_baileys_message(
                 clean_phone_for_vm,  # ✅ Apenas número limpo
                 confirmation_message
             )
@@ -379,25 +379,18 @@ Situação: {situation[:200]}{'...' if len(situation) > 200 else ''}
             lawyers = get_lawyers_for_notification()
             notification_message = f"ℹ️ O cliente '{lead_name}' foi atribuido pelo {assigned_lawyer_name}."
             
-            for lawyer in lawyers:
-                # Skip the lawyer who took the case
-                if lawyer["phone"] == assigned_lawyer_id:
-                    continue
-                
-                try:
-                    # ✅ LIMPEZA DO NÚMERO
-                    lawyer_phone_clean = ''.join(filter(str.isdigit, lawyer["phone"]))
-                    if not lawyer_phone_clean.startswith("55"):
-                        lawyer_phone_clean = f"55{lawyer_phone_clean}"
-                    
-                    await baileys_service.send_whatsapp_message(
-                        lawyer_phone_clean,  # ✅ Apenas número limpo
-                        notification_message
-                    )
+            # Skip the lawyer who took the case
+            others = [lawyer for lawyer in lawyers if lawyer["phone"] != assigned_lawyer_id]
+            
+            # ✅ LIMPEZA DO NÚMERO + ENVIO EM PARALELO
+            results = await self._send_to_lawyers(
+                [(normalize_br_phone(lawyer["phone"]), notification_message) for lawyer in others]
+            )
+            for lawyer, result in zip(others, results):
+                if isinstance(result, Exception):
+                    logger.error(f"❌ Error notifying {lawyer['name']}: {str(result)}")
+                else:
                     logger.info(f"📢 Notified {lawyer['name']} that case was taken")
-                    
-                except Exception as e:
-                    logger.error(f"❌ Error notifying {lawyer['name']}: {str(e)}")
             
             return True
             
@@ -405,6 +398,19 @@ Situação: {situation[:200]}{'...' if len(situation) > 200 else ''}
             logger.error(f"❌ Error notifying other lawyers: {str(e)}")
             return False
 
+    async def _send_to_lawyers(self, messages: List[Tuple[str, str]]) -> List[Any]:
+        """
+        Envia (telefone, mensagem) em paralelo, no máximo LAWYER_NOTIFY_CONCURRENCY por vez.
+
+        Retorna um resultado por mensagem na mesma ordem: o bool do envio ou a
+        exceção levantada.
+        """
+        async def send(phone: str, message: str) -> bool:
+            async with self._notify_sem:
+                return await send_baileys_message(phone, message)
+
+        return await asyncio.gather(*(send(phone, message) for phone, message in messages), return_exceptions=True)
+
 
 # Global service instance
 lead_assignment_service = LeadAssignmentService()
@@ -11,28 +11,219 @@ Sistema de orquestração inteligente que combina:
 
 import os
 import re
-import json
-import uuid
 import asyncio
 import logging
-import pytz
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Tuple
-from collections import defaultdict
+import time
+import secrets
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from typing import Dict, Any, Optional, List, Set, Tuple
+from collections import deque
+from types import MappingProxyType
+from contextlib import asynccontextmanager
+from cachetools import TTLCache
+import orjson
 
 # Import services
 from app.services.firebase_service import (
     get_conversation_flow, 
-    save_user_session, 
-    get_user_session,
     save_lead_data
 )
-from app.services.baileys_service import baileys_service
+# Sessões: Redis quando configurado (Firestore só para o lead final)
+from app.services.session_store import save_user_session, get_user_session
+from app.services.baileys_service import send_baileys_message
 from app.services.lawyer_notification_service import lawyer_notification_service
+from app.services.ai_chain import redis_client, get_ai_orchestrator
+from app.utils.phone import digits_only
+from app.utils.log_context import correlation_id_var
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Amostragem do log por mensagem: 1 a cada N em INFO, o resto em DEBUG
+# (erros e avisos continuam sempre em seus próprios níveis)
+LOG_SAMPLE_EVERY = max(1, int(os.getenv("ORCHESTRATOR_LOG_SAMPLE_EVERY", "20")))
+
+# Orquestrador de IA: resolvido sob demanda via get_ai_orchestrator() (criação
+# lazy do LLM); pode ser substituído aqui, por exemplo em testes
+ai_orchestrator = None
+
+# Circuit breaker do Gemini (global, compartilhado entre sessões): após N falhas
+# seguidas (timeout/quota), todas as sessões vão direto ao fallback no cooldown
+GEMINI_TIMEOUT = 15.0
+# Timeout adaptativo: p95 das últimas latências de sucesso * 1.5, nunca acima de GEMINI_TIMEOUT
+GEMINI_LATENCY_WINDOW = 100
+GEMINI_LATENCY_MIN_SAMPLES = 20
+GEMINI_TIMEOUT_REFRESH = 30.0
+GEMINI_BREAKER_THRESHOLD = 5
+GEMINI_BREAKER_COOLDOWN = 60.0
+
+# Indicadores de erro de quota do Gemini em uma única busca (case-insensitive)
+QUOTA_RE = re.compile(
+    r"quota|429|too many requests|rate limit|billing|resource[_ ]?exhausted|limit exceeded",
+    re.IGNORECASE
+)
+
+# Fuso de Brasília resolvido uma vez; sem base tz no sistema, UTC-3 fixo
+# (o Brasil não tem horário de verão desde 2019)
+try:
+    BRASILIA_TZ = ZoneInfo("America/Sao_Paulo")
+except Exception:
+    BRASILIA_TZ = timezone(timedelta(hours=-3), "BRT")
+
+
+def _get_personalized_greeting() -> str:
+    """Saudação pelo horário de Brasília: Bom dia (5h-12h), Boa tarde (12h-18h), Boa noite."""
+    hour = datetime.now(BRASILIA_TZ).hour
+    if 5 <= hour < 12:
+        return "Bom dia"
+    if 12 <= hour < 18:
+        return "Boa tarde"
+    return "Boa noite"
+
+
+# Mensagens completas por saudação, montadas uma vez no import
+WELCOME_MESSAGES = {
+    greeting: f"{greeting}! Seja bem-vindo ao m.lima. Estou aqui para entender seu caso e agilizar o contato com um de nossos advogados especializados.\n\nPara começar, qual é o seu nome completo?"
+    for greeting in ("Bom dia", "Boa tarde", "Boa noite")
+}
+RESTART_MESSAGES = {
+    greeting: f"{greeting}! Vamos começar uma nova conversa. Para começar, qual é o seu nome completo?"
+    for greeting in ("Bom dia", "Boa tarde", "Boa noite")
+}
+
+# Confirmação enviada ao usuário no WhatsApp ao concluir o fluxo
+USER_CONFIRMATION_MESSAGE = (
+    "Olá {user_name}! 👋\n\nObrigado por entrar em contato com o m.lima.\n\n"
+    "Suas informações foram registradas e em breve um de nossos advogados especializados entrará em contato.\n\n"
+    "Fique tranquilo, você está em boas mãos! 🤝"
+)
+
+
+# Gatilhos de reinício de conversa: uma única busca compilada (mesma semântica
+# de "qualquer gatilho contido na mensagem")
+_RESTART_TRIGGERS_RE = re.compile("oi|olá|hello|começar|iniciar|novo|restart")
+
+# Comprimentos válidos de telefone (10 a 13 dígitos) como bitmask: um shift
+# e um AND no lugar da cascata de comparações
+_PHONE_LENGTHS_MASK = (1 << 10) | (1 << 11) | (1 << 12) | (1 << 13)
+
+# Fluxo padrão quando o Firebase não responde a tempo
+_DEFAULT_FLOW: Dict[str, Any] = {
+    "steps": [
+        {"id": 1, "question": "Qual é o seu nome completo?"},
+        {"id": 2, "question": "Qual o seu telefone e e-mail?"},
+        {"id": 3, "question": "Em qual área você precisa de ajuda? (Penal ou Saúde)"},
+        {"id": 4, "question": "Descreva sua situação:"},
+        {"id": 5, "question": "Posso direcioná-lo para nosso especialista?"}
+    ],
+    "completion_message": "Perfeito! Nossa equipe entrará em contato."
+}
+
+
+def _index_steps(flow: Dict[str, Any]) -> Dict[Any, Dict[str, Any]]:
+    """Steps do fluxo indexados por id (lookup O(1) por mensagem)."""
+    return {step["id"]: step for step in flow.get("steps", [])}
+
+
+_DEFAULT_STEPS_BY_ID = _index_steps(_DEFAULT_FLOW)
+
+# Step do fluxo que pergunta o contato (telefone/e-mail)
+CONTACT_STEP = 2
+
+# Chaves das respostas no lead_data ("step_1", "step_2", ...) pré-formatadas
+STEP_KEYS = tuple(f"step_{i}" for i in range(1, 11))
+
+
+def _step_key(step: int) -> str:
+    """Chave do lead_data para o step (sem formatar string nos steps usuais)."""
+    return STEP_KEYS[step - 1] if 1 <= step <= len(STEP_KEYS) else f"step_{step}"
+
+
+def _personalize(text: str, lead_data: Dict[str, Any]) -> str:
+    """Substitui {user_name} (primeiro nome do step 1) e {area} (step 3) no texto."""
+    if "{user_name}" in text and "step_1" in lead_data:
+        text = text.replace("{user_name}", lead_data["step_1"].split()[0])
+    if "{area}" in text and "step_3" in lead_data:
+        text = text.replace("{area}", lead_data["step_3"])
+    return text
+
+
+# Campos que definem o estado persistido da sessão (last_updated fica de fora:
+# muda sempre e sozinho não justifica uma escrita no Firestore)
+_SESSION_DIGEST_FIELDS = ("current_step", "flow_completed", "phone_submitted", "lead_data", "message_count")
+SESSION_DIGEST_CACHE_SIZE = 10_000
+SESSION_DIGEST_TTL = 3600
+
+# Fluxo de conversa (Firebase) muda raramente: cache local por FLOW_CACHE_TTL segundos
+FLOW_CACHE_TTL = 300.0
+
+# Defaults do contexto da sessão: um merge (dict | dict, em C) no lugar de
+# um .get() com default por campo
+_SESSION_DEFAULTS: Dict[str, Any] = {
+    "current_step": 1,
+    "flow_completed": False,
+    "phone_submitted": False,
+    "message_count": 0,
+    "gemini_available": True
+}
+
+# Contexto de sessão memoizado por pouco tempo: polls de status da mesma
+# sessão não viram uma leitura por chamada; gravações invalidam a entrada
+SESSION_CONTEXT_CACHE_SIZE = 10_000
+SESSION_CONTEXT_CACHE_TTL = 0.5
+
+# Status geral memoizado: polls de health/status dentro do TTL reusam o resultado
+STATUS_CACHE_TTL = 1.0
+# Parte fixa do status geral (somente leitura); só os campos do Gemini mudam
+_STATUS_TEMPLATE = MappingProxyType({
+    "overall_status": "active",
+    "firebase_status": "active",
+    "features": (
+        "intelligent_conversation_flow",
+        "ai_first_fallback_second",
+        "automatic_lead_collection",
+        "whatsapp_integration",
+        "lawyer_notifications",
+        "session_management",
+        "rate_limiting",
+        "auto_restart_capability"
+    )
+})
+
+# Rate limiting: janela deslizante no Redis (compartilhada entre workers).
+# "exact": ZSET com um membro por mensagem; um script atômico limpa a janela,
+# conta e registra. "approx": dois contadores de janela fixa ponderados pelo
+# tempo decorrido (~16 B por chave em vez de ~100 B por mensagem).
+RATE_LIMIT_MODE = os.getenv("RATE_LIMIT_MODE", "exact")
+RATE_LIMIT_WINDOW_MS = 60_000
+RATE_LIMIT_WINDOW_S = RATE_LIMIT_WINDOW_MS // 1000
+RATE_LIMIT_KEY_PREFIX = "rl:"
+_RATE_LIMIT_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, tonumber(ARGV[1]) - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 1
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 0
+"""
+_RATE_LIMIT_APPROX_LUA = """
+local cur = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]) * 2)
+local prev = tonumber(redis.call('GET', KEYS[2]) or '0')
+local weight = (tonumber(ARGV[3]) - tonumber(ARGV[1])) / tonumber(ARGV[3])
+if prev * weight + cur > tonumber(ARGV[2]) then
+    return 1
+end
+return 0
+"""
+# register_script guarda o SHA e usa EVALSHA (recarrega sozinho em NOSCRIPT)
+_rate_limit_script = (
+    redis_client.register_script(_RATE_LIMIT_APPROX_LUA if RATE_LIMIT_MODE == "approx" else _RATE_LIMIT_LUA)
+    if redis_client is not None else None
+)
+
 class IntelligentHybridOrchestrator:
     """
     ✅ ORQUESTRADOR DE FLUXO ESTRUTURADO
@@ -58,13 +249,47 @@ class IntelligentHybridOrchestrator:
         self.whatsapp_timeout = 15.0
         self.whatsapp_global_timeout = 30.0
         self.notification_timeout = 20.0
+        self.gemini_timeout = GEMINI_TIMEOUT
+        self._gemini_latencies: deque = deque(maxlen=GEMINI_LATENCY_WINDOW)
+        self._gemini_timeout_at = 0.0  # monotonic do último recálculo do timeout
+
+        # Estado do Gemini: gemini_available espelha o circuit breaker fechado
+        self.gemini_available = True
+        self._gemini_breaker = {
+            "failures": 0,
+            "opened_at": 0.0,
+            "cooldown": GEMINI_BREAKER_COOLDOWN,
+            "threshold": GEMINI_BREAKER_THRESHOLD
+        }
         
-        # Rate limiting
-        self.message_counts = defaultdict(list)
+        # Contador para a amostragem do log de mensagens recebidas
+        self._messages_seen = 0
+
+        # Rate limiting (Redis quando configurado; janela local só sem Redis).
+        # Local: [janela atual, contagem da anterior, contagem da atual] por sessão
+        self.message_counts: Dict[str, list] = {}
         self.max_messages_per_minute = 10
         
-        # Session locks para evitar race conditions
-        self.session_locks = defaultdict(asyncio.Lock)
+        # Session locks para evitar race conditions: [lock, nº de usuários].
+        # A entrada sai do dict quando ninguém mais usa o lock da sessão.
+        self.session_locks: Dict[str, list] = {}
+        # Última gravação agendada por sessão (o próximo a pegar o lock espera por ela)
+        self._pending_saves: Dict[str, asyncio.Task] = {}
+        # Digest do último estado salvo/lido por sessão: pula escritas sem mudança
+        self._saved_digests: TTLCache = TTLCache(maxsize=SESSION_DIGEST_CACHE_SIZE, ttl=SESSION_DIGEST_TTL)
+        # Finalizações de lead em background (referência forte até terminarem)
+        self._lead_tasks: Set[asyncio.Task] = set()
+
+        # Cache do fluxo de conversa (single-flight: uma busca em andamento por vez)
+        self._flow_cache: Dict[str, Any] = {"data": None, "by_id": {}, "expires": 0.0, "loading": None}
+
+        # Contextos de sessão recentes (get_session_context)
+        self._session_context_cache: TTLCache = TTLCache(
+            maxsize=SESSION_CONTEXT_CACHE_SIZE, ttl=SESSION_CONTEXT_CACHE_TTL
+        )
+
+        # Último status geral montado: (expira_em, status)
+        self._status_cache: Optional[Tuple[float, Dict[str, Any]]] = None
         
 
     def safe_get_lead_data(self, session_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -132,36 +357,23 @@ class IntelligentHybridOrchestrator:
         
         Seguido da pergunta do nome completo.
         """
-        correlation_id = str(uuid.uuid4())[:8]
+        correlation_id = secrets.token_hex(4)
+        correlation_id_var.set(correlation_id)  # vai para todo log desta requisição
+        now = datetime.now()  # um único relógio para id e timestamps da sessão
         
         try:
             # ✅ GERAR SESSION_ID SE NÃO FORNECIDO
             if not session_id:
-                session_id = f"web_{int(datetime.now().timestamp())}_{correlation_id}"
+                session_id = f"web_{int(now.timestamp())}_{correlation_id}"
             
-            logger.info(f"🚀 [{correlation_id}] Iniciando conversa para sessão: {session_id}")
+            logger.info(f"🚀 Iniciando conversa para sessão: {session_id}")
             
             # ✅ SAUDAÇÃO PERSONALIZADA BASEADA NO HORÁRIO (BRASÍLIA)
-            try:
-                brasilia_tz = pytz.timezone('America/Sao_Paulo')
-                now = datetime.now(brasilia_tz)
-                hour = now.hour
-                
-                if 5 <= hour < 12:
-                    greeting = "Bom dia"
-                elif 12 <= hour < 18:
-                    greeting = "Boa tarde"
-                else:
-                    greeting = "Boa noite"
-                    
-                logger.info(f"🌅 [{correlation_id}] Saudação: {greeting} (hora: {hour}h)")
-                
-            except Exception as tz_error:
-                logger.warning(f"⚠️ [{correlation_id}] Erro timezone: {str(tz_error)} - usando saudação padrão")
-                greeting = "Olá"
+            greeting = _get_personalized_greeting()
+            logger.info(f"🌅 Saudação: {greeting}")
             
             # ✅ MENSAGEM DE BOAS-VINDAS PERSONALIZADA
-            welcome_message = f"{greeting}! Seja bem-vindo ao m.lima. Estou aqui para entender seu caso e agilizar o contato com um de nossos advogados especializados.\n\nPara começar, qual é o seu nome completo?"
+            welcome_message = WELCOME_MESSAGES[greeting]
             
             # ✅ CRIAR SESSÃO INICIAL
             session_data = {
@@ -172,8 +384,8 @@ class IntelligentHybridOrchestrator:
                 "message_count": 0,
                 "lead_data": {},  # ✅ SEMPRE INICIALIZAR COMO DICT
                 "platform": "web",
-                "created_at": datetime.now().isoformat(),
-                "last_updated": datetime.now().isoformat()
+                "created_at": now.isoformat(),
+                "last_updated": now.isoformat()
             }
             
             # ✅ SALVAR SESSÃO INICIAL
@@ -182,9 +394,10 @@ class IntelligentHybridOrchestrator:
                     save_user_session(session_id, session_data),
                     timeout=self.firebase_timeout
                 )
-                logger.info(f"💾 [{correlation_id}] Sessão inicial salva")
+                self._invalidate_session_context(session_id)
+                logger.info("💾 Sessão inicial salva")
             except Exception as save_error:
-                logger.error(f"❌ [{correlation_id}] Erro ao salvar sessão inicial: {str(save_error)}")
+                logger.error(f"❌ Erro ao salvar sessão inicial: {str(save_error)}")
                 # ✅ CONTINUAR MESMO COM ERRO DE SAVE
             
             return {
@@ -200,7 +413,7 @@ class IntelligentHybridOrchestrator:
             }
             
         except Exception as e:
-            logger.error(f"❌ [{correlation_id}] Erro ao iniciar conversa: {str(e)}")
+            logger.error(f"❌ Erro ao iniciar conversa: {str(e)}")
             
             # ✅ FALLBACK SEGURO COM LEAD_DATA VÁLIDO
             return {
@@ -231,14 +444,15 @@ class IntelligentHybridOrchestrator:
         - Fallback seguro em caso de erro
         - Sempre retorna lead_data válido
         """
-        correlation_id = str(uuid.uuid4())[:8]
+        correlation_id = secrets.token_hex(4)
+        correlation_id_var.set(correlation_id)  # vai para todo log desta requisição
         
         try:
-            logger.info(f"📨 [{correlation_id}] Processando: '{message[:50]}...' | Session: {session_id}")
+            self._log_message_sampled(message, session_id)
             
             # ✅ RATE LIMITING
-            if self._is_rate_limited(session_id):
-                logger.warning(f"⏰ [{correlation_id}] Rate limited: {session_id}")
+            if await self._is_rate_limited(session_id):
+                logger.warning(f"⏰ Rate limited: {session_id}")
                 return {
                     "session_id": session_id,
                     "response": "⏳ Muitas mensagens em pouco tempo. Aguarde um momento...",
@@ -247,83 +461,94 @@ class IntelligentHybridOrchestrator:
                     "correlation_id": correlation_id
                 }
             
-            # ✅ OBTER SESSÃO COM TIMEOUT
-            try:
-                session_data = await asyncio.wait_for(
-                    get_user_session(session_id),
-                    timeout=self.firebase_timeout
-                )
-            except asyncio.TimeoutError:
-                logger.warning(f"⏰ [{correlation_id}] Timeout ao buscar sessão {session_id}")
-                session_data = None
-            except Exception as session_error:
-                logger.error(f"❌ [{correlation_id}] Erro ao buscar sessão: {str(session_error)}")
-                session_data = None
+            # ✅ LOCK POR SESSÃO: leitura -> alteração -> gravação sem lost updates
+            async with self._session_guard(session_id):
+                # ✅ OBTER SESSÃO COM TIMEOUT
+                try:
+                    session_data = await asyncio.wait_for(
+                        get_user_session(session_id),
+                        timeout=self.firebase_timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"⏰ Timeout ao buscar sessão {session_id}")
+                    session_data = None
+                except Exception as session_error:
+                    logger.error(f"❌ Erro ao buscar sessão: {str(session_error)}")
+                    session_data = None
+
+                if session_data:
+                    # Estado como está no Firestore: base para detectar mudanças
+                    self._saved_digests[session_id] = self._session_digest(session_data)
             
-            # ✅ CRIAR SESSÃO PADRÃO SE NÃO EXISTIR
-            if not session_data:
-                logger.info(f"🆕 [{correlation_id}] Criando nova sessão: {session_id}")
-                session_data = {
-                    "session_id": session_id,
-                    "current_step": 1,
-                    "flow_completed": False,
-                    "phone_submitted": False,
-                    "message_count": 0,
-                    "lead_data": {},  # ✅ SEMPRE INICIALIZAR COMO DICT
-                    "gemini_available": self.gemini_available,
-                    "platform": platform
-                }
+                # ✅ CRIAR SESSÃO PADRÃO SE NÃO EXISTIR
+                if not session_data:
+                    logger.info(f"🆕 Criando nova sessão: {session_id}")
+                    session_data = {
+                        "session_id": session_id,
+                        "current_step": 1,
+                        "flow_completed": False,
+                        "phone_submitted": False,
+                        "message_count": 0,
+                        "lead_data": {},  # ✅ SEMPRE INICIALIZAR COMO DICT
+                        "gemini_available": self.gemini_available,
+                        "platform": platform
+                    }
             
-            # ✅ GARANTIR INTEGRIDADE DA SESSÃO
-            session_data = await self._ensure_session_integrity(session_id, session_data)
+                # ✅ GARANTIR INTEGRIDADE DA SESSÃO
+                session_data = await self._ensure_session_integrity(session_id, session_data)
+            
+                # ✅ AUTO-REINICIALIZAÇÃO SE NECESSÁRIO
+                if session_data.get("flow_completed") and session_data.get("phone_submitted"):
+                    # ✅ DETECTAR TENTATIVA DE NOVA CONVERSA
+                    if _RESTART_TRIGGERS_RE.search(message.lower()):
+                        logger.info("🔄 Auto-reinicialização detectada")
+                        return await self._auto_restart_session(session_id, message, correlation_id)
+            
+                # ✅ VERIFICAR SE PRECISA COLETAR TELEFONE
+                if session_data.get("flow_completed") and not session_data.get("phone_submitted"):
+                    logger.info("📱 Coletando telefone")
+                    return await self._handle_phone_collection(session_data, message, correlation_id)
+
+                # ✅ FAST PATH: no step de contato, resposta que é só um telefone não
+                # precisa da IA (vai direto ao fluxo estruturado, sem esperar o Gemini)
+                if session_data.get("current_step") == CONTACT_STEP and self._is_phone_number(message):
+                    logger.info("📱 Mensagem é um telefone - fluxo estruturado sem Gemini")
+                    return await self._get_fallback_response(session_data, message, correlation_id)
+            
+                # ✅ TENTAR GEMINI PRIMEIRO
+                gemini_result = await self._attempt_gemini_response(message, session_id, session_data, correlation_id)
             
-            # ✅ AUTO-REINICIALIZAÇÃO SE NECESSÁRIO
-            if session_data.get("flow_completed") and session_data.get("phone_submitted"):
-                # ✅ DETECTAR TENTATIVA DE NOVA CONVERSA
-                restart_triggers = ["oi", "olá", "hello", "começar", "iniciar", "novo", "restart"]
-                if any(trigger in message.lower() for trigger in restart_triggers):
-                    logger.info(f"🔄 [{correlation_id}] Auto-reinicialização detectada")
-                    return await self._auto_restart_session(session_id, message, correlation_id)
-            
-            # ✅ VERIFICAR SE PRECISA COLETAR TELEFONE
-            if session_data.get("flow_completed") and not session_data.get("phone_submitted"):
-                logger.info(f"📱 [{correlation_id}] Coletando telefone")
-                return await self._handle_phone_collection(session_data, message, correlation_id)
-            
-            # ✅ TENTAR GEMINI PRIMEIRO
-            gemini_result = await self._attempt_gemini_response(message, session_id, session_data, correlation_id)
-            
-            if gemini_result["success"]:
-                # ✅ SUCESSO COM GEMINI
-                logger.info(f"🤖 [{correlation_id}] Resposta Gemini gerada")
+                if gemini_result["success"]:
+                    # ✅ SUCESSO COM GEMINI
+                    logger.info("🤖 Resposta Gemini gerada")
                 
-                result = {
-                    "session_id": session_id,
-                    "response": gemini_result["response"],
-                    "response_type": "ai_intelligent",
-                    "ai_mode": True,
-                    "gemini_available": True,
-                    "lead_data": self.safe_get_lead_data(session_data),  # ✅ SEMPRE VÁLIDO
-                    "message_count": session_data.get("message_count", 0) + 1,
-                    "correlation_id": correlation_id
-                }
+                    result = {
+                        "session_id": session_id,
+                        "response": gemini_result["response"],
+                        "response_type": "ai_intelligent",
+                        "ai_mode": True,
+                        "gemini_available": True,
+                        "lead_data": self.safe_get_lead_data(session_data),  # ✅ SEMPRE VÁLIDO
+                        "message_count": session_data.get("message_count", 0) + 1,
+                        "correlation_id": correlation_id
+                    }
                 
-                # ✅ ATUALIZAR CONTADOR DE MENSAGENS
-                session_data["message_count"] = result["message_count"]
-                session_data["last_updated"] = datetime.now().isoformat()
+                    # ✅ ATUALIZAR CONTADOR DE MENSAGENS
+                    session_data["message_count"] = result["message_count"]
+                    session_data["last_updated"] = datetime.now().isoformat()
                 
-                # ✅ SALVAR SESSÃO ATUALIZADA (ASYNC)
-                asyncio.create_task(self._save_session_async(session_id, session_data, correlation_id))
+                    # ✅ SALVAR SESSÃO ATUALIZADA (ASYNC)
+                    self._schedule_session_save(session_id, session_data, correlation_id)
                 
-                return result
+                    return result
             
-            # ✅ FALLBACK PARA FLUXO FIREBASE
-            logger.info(f"🚀 [{correlation_id}] Usando fallback Firebase - Gemini: {gemini_result['reason']}")
-            return await self._get_fallback_response(session_data, message, correlation_id)
+                # ✅ FALLBACK PARA FLUXO FIREBASE
+                logger.info(f"🚀 Usando fallback Firebase - Gemini: {gemini_result['reason']}")
+                return await self._get_fallback_response(session_data, message, correlation_id)
             
         except Exception as e:
-            logger.error(f"❌ [{correlation_id}] Erro crítico ao processar mensagem: {str(e)}")
-            logger.error(f"❌ [{correlation_id}] Stack trace:", exc_info=True)
+            logger.error(f"❌ Erro crítico ao processar mensagem: {str(e)}")
+            logger.error("❌ Stack trace:", exc_info=True)
             
             # ✅ FALLBACK SEGURO COM LEAD_DATA VÁLIDO
             return {
@@ -338,6 +563,13 @@ class IntelligentHybridOrchestrator:
                 "correlation_id": correlation_id
             }
 
+    def _log_message_sampled(self, message: str, session_id: str):
+        """Log de entrada por mensagem com amostragem (1 a cada LOG_SAMPLE_EVERY em INFO)."""
+        self._messages_seen += 1
+        level = logging.INFO if self._messages_seen % LOG_SAMPLE_EVERY == 0 else logging.DEBUG
+        if logger.isEnabledFor(level):
+            logger.log(level, "📨 Processando: '%s...' | Session: %s", message[:50], session_id)
+
     async def _auto_restart_session(self, session_id: str, message: str, correlation_id: str) -> Dict[str, Any]:
         """
         ✅ AUTO-REINICIALIZAÇÃO DE SESSÃO
@@ -345,7 +577,7 @@ class IntelligentHybridOrchestrator:
         Remove o problema do chat "finalizado" permanente.
         """
         try:
-            logger.info(f"🔄 [{correlation_id}] Reinicializando sessão: {session_id}")
+            logger.info(f"🔄 Reinicializando sessão: {session_id}")
             
             # ✅ CRIAR NOVA SESSÃO LIMPA
             new_session_data = {
@@ -366,27 +598,15 @@ class IntelligentHybridOrchestrator:
                     save_user_session(session_id, new_session_data),
                     timeout=self.firebase_timeout
                 )
-                logger.info(f"💾 [{correlation_id}] Sessão reinicializada e salva")
+                self._invalidate_session_context(session_id)
+                logger.info("💾 Sessão reinicializada e salva")
             except Exception as save_error:
-                logger.error(f"❌ [{correlation_id}] Erro ao salvar sessão reinicializada: {str(save_error)}")
+                logger.error(f"❌ Erro ao salvar sessão reinicializada: {str(save_error)}")
             
             # ✅ SAUDAÇÃO DE REINICIALIZAÇÃO
-            try:
-                brasilia_tz = pytz.timezone('America/Sao_Paulo')
-                now = datetime.now(brasilia_tz)
-                hour = now.hour
-                
-                if 5 <= hour < 12:
-                    greeting = "Bom dia"
-                elif 12 <= hour < 18:
-                    greeting = "Boa tarde"
-                else:
-                    greeting = "Boa noite"
-                    
-            except Exception:
-                greeting = "Olá"
+            greeting = _get_personalized_greeting()
             
-            restart_message = f"{greeting}! Vamos começar uma nova conversa. Para começar, qual é o seu nome completo?"
+            restart_message = RESTART_MESSAGES[greeting]
             
             return {
                 "session_id": session_id,
@@ -402,7 +622,7 @@ class IntelligentHybridOrchestrator:
             }
             
         except Exception as e:
-            logger.error(f"❌ [{correlation_id}] Erro ao reinicializar sessão: {str(e)}")
+            logger.error(f"❌ Erro ao reinicializar sessão: {str(e)}")
             
             return {
                 "session_id": session_id,
@@ -428,59 +648,96 @@ class IntelligentHybridOrchestrator:
         ✅ TENTAR RESPOSTA GEMINI COM TIMEOUT E DETECÇÃO DE QUOTA
         """
         try:
-            # ✅ VERIFICAR SE GEMINI ESTÁ DISPONÍVEL
-            if not self.gemini_available:
-                time_since_check = datetime.now() - self.last_gemini_check
-                if time_since_check < self.gemini_check_interval:
-                    return {"success": False, "reason": "gemini_marked_unavailable"}
+            # ✅ CIRCUIT BREAKER: GEMINI FORA DO AR, IR DIRETO PARA O FALLBACK
+            if self._gemini_breaker_open():
+                return {"success": False, "reason": "gemini_marked_unavailable"}
             
-            logger.info(f"🤖 [{correlation_id}] Tentando Gemini (timeout: {self.gemini_timeout}s)")
+            timeout = self._current_gemini_timeout()
+            logger.info(f"🤖 Tentando Gemini (timeout: {timeout:.1f}s)")
             
-            # ✅ CHAMAR GEMINI COM TIMEOUT
+            # ✅ CHAMAR GEMINI COM TIMEOUT ADAPTATIVO
+            orchestrator = ai_orchestrator or get_ai_orchestrator()
+            started = time.monotonic()
             response = await asyncio.wait_for(
-                ai_orchestrator.generate_response(
+                orchestrator.generate_response(
                     message, 
                     session_id=session_id,
                     context={"platform": session_data.get("platform", "web")}
                 ),
-                timeout=self.gemini_timeout
+                timeout=timeout
             )
             
             if response and len(response.strip()) > 0:
-                logger.info(f"✅ [{correlation_id}] Gemini response received")
-                self.gemini_available = True
-                self.last_gemini_check = datetime.now()
+                self._gemini_latencies.append(time.monotonic() - started)
+                logger.info("✅ Gemini response received")
+                self._record_gemini_success()
                 return {"success": True, "response": response}
             else:
-                logger.warning(f"⚠️ [{correlation_id}] Gemini returned empty response")
+                logger.warning("⚠️ Gemini returned empty response")
                 return {"success": False, "reason": "empty_response"}
                 
         except asyncio.TimeoutError:
-            logger.warning(f"⏰ [{correlation_id}] Gemini timeout ({self.gemini_timeout}s)")
-            self.gemini_available = False
-            self.last_gemini_check = datetime.now()
+            logger.warning(f"⏰ Gemini timeout ({self.gemini_timeout:.1f}s)")
+            self._record_gemini_failure()
             return {"success": False, "reason": "timeout"}
             
         except Exception as e:
-            error_str = str(e).lower()
-            
             # ✅ DETECTAR ERROS DE QUOTA
-            if self._is_quota_error(error_str):
-                logger.warning(f"🚫 [{correlation_id}] Gemini quota exceeded: {str(e)}")
-                self.gemini_available = False
-                self.last_gemini_check = datetime.now()
+            if self._is_quota_error(str(e)):
+                logger.warning(f"🚫 Gemini quota exceeded: {str(e)}")
+                self._record_gemini_failure()
                 return {"success": False, "reason": "quota_exceeded"}
             else:
-                logger.error(f"❌ [{correlation_id}] Gemini API error: {str(e)}")
+                logger.error(f"❌ Gemini API error: {str(e)}")
                 return {"success": False, "reason": "api_error"}
 
+    def _current_gemini_timeout(self) -> float:
+        """
+        Timeout do Gemini = min(GEMINI_TIMEOUT, p95 * 1.5) das latências recentes.
+
+        Recalculado no máximo a cada GEMINI_TIMEOUT_REFRESH segundos; com
+        poucas amostras usa o teto fixo.
+        """
+        now = time.monotonic()
+        if now - self._gemini_timeout_at >= GEMINI_TIMEOUT_REFRESH:
+            self._gemini_timeout_at = now
+            samples = len(self._gemini_latencies)
+            if samples < GEMINI_LATENCY_MIN_SAMPLES:
+                self.gemini_timeout = GEMINI_TIMEOUT
+            else:
+                p95 = sorted(self._gemini_latencies)[int(0.95 * samples)]
+                self.gemini_timeout = min(GEMINI_TIMEOUT, p95 * 1.5)
+        return self.gemini_timeout
+
+    def _gemini_breaker_open(self) -> bool:
+        """Aberto: pula o Gemini até o fim do cooldown (depois libera uma nova tentativa)."""
+        breaker = self._gemini_breaker
+        if breaker["failures"] < breaker["threshold"]:
+            return False
+        return time.monotonic() - breaker["opened_at"] < breaker["cooldown"]
+
+    def _record_gemini_success(self):
+        if not self.gemini_available:
+            logger.info("✅ Gemini voltou a responder - circuit breaker fechado")
+        self._gemini_breaker["failures"] = 0
+        self.gemini_available = True
+
+    def _record_gemini_failure(self):
+        breaker = self._gemini_breaker
+        breaker["failures"] += 1
+        if breaker["failures"] >= breaker["threshold"]:
+            # Abre (ou reabre, se a tentativa pós-cooldown falhou) por mais um cooldown
+            if self.gemini_available:
+                logger.warning(
+                    f"🚧 Gemini circuit breaker aberto por {breaker['cooldown']:.0f}s "
+                    f"após {breaker['failures']} falhas"
+                )
+            breaker["opened_at"] = time.monotonic()
+            self.gemini_available = False
+
     def _is_quota_error(self, error_message: str) -> bool:
         """Detectar erros de quota do Gemini."""
-        quota_indicators = [
-            "quota", "429", "too many requests", "rate limit", 
-            "billing", "resourceexhausted", "limit exceeded"
-        ]
-        return any(indicator in error_message for indicator in quota_indicators)
+        return QUOTA_RE.search(error_message) is not None
 
     async def _get_fallback_response(
         self, 
@@ -496,38 +753,27 @@ class IntelligentHybridOrchestrator:
             current_step = session_data.get("current_step", 1)
             lead_data = self.safe_get_lead_data(session_data)  # ✅ SEMPRE DICT VÁLIDO
             
-            logger.info(f"🚀 [{correlation_id}] Fallback Firebase - Step {current_step}")
+            logger.info(f"🚀 Fallback Firebase - Step {current_step}")
             
-            # ✅ OBTER FLUXO DE CONVERSA
+            # ✅ OBTER FLUXO DE CONVERSA (CACHE LOCAL)
             try:
-                flow = await asyncio.wait_for(
-                    get_conversation_flow(),
-                    timeout=self.firebase_timeout
-                )
+                flow = await self._cached_flow()
             except asyncio.TimeoutError:
-                logger.warning(f"⏰ [{correlation_id}] Timeout ao buscar fluxo - usando fallback")
-                flow = {
-                    "steps": [
-                        {"id": 1, "question": "Qual é o seu nome completo?"},
-                        {"id": 2, "question": "Qual o seu telefone e e-mail?"},
-                        {"id": 3, "question": "Em qual área você precisa de ajuda? (Penal ou Saúde)"},
-                        {"id": 4, "question": "Descreva sua situação:"},
-                        {"id": 5, "question": "Posso direcioná-lo para nosso especialista?"}
-                    ],
-                    "completion_message": "Perfeito! Nossa equipe entrará em contato."
-                }
+                logger.warning("⏰ Timeout ao buscar fluxo - usando fallback")
+                flow = _DEFAULT_FLOW
             
-            steps = flow.get("steps", [])
+            steps_by_id = self._steps_by_id(flow)
+            total_steps = len(flow.get("steps", []))
             
             # ✅ VALIDAR E AVANÇAR STEP
-            if current_step <= len(steps):
+            if current_step <= total_steps:
                 # ✅ SALVAR RESPOSTA ATUAL
-                lead_data[f"step_{current_step}"] = message.strip()
+                lead_data[_step_key(current_step)] = message.strip()
                 
                 # ✅ VALIDAR RESPOSTA (BÁSICO)
                 if not self._should_advance_step(message, current_step):
                     # ✅ RE-PROMPT MESMA PERGUNTA
-                    current_question_data = next((s for s in steps if s["id"] == current_step), None)
+                    current_question_data = steps_by_id.get(current_step)
                     if current_question_data:
                         return {
                             "session_id": session_id,
@@ -543,21 +789,12 @@ class IntelligentHybridOrchestrator:
                 
                 next_step = current_step + 1
                 
-                if next_step <= len(steps):
+                if next_step <= total_steps:
                     # ✅ PRÓXIMA PERGUNTA
-                    next_question_data = next((s for s in steps if s["id"] == next_step), None)
+                    next_question_data = steps_by_id.get(next_step)
                     if next_question_data:
-                        next_question = next_question_data["question"]
-                        
-                        # ✅ PERSONALIZAR COM NOME
-                        if "{user_name}" in next_question and "step_1" in lead_data:
-                            user_name = lead_data["step_1"].split()[0]
-                            next_question = next_question.replace("{user_name}", user_name)
-                        
-                        # ✅ PERSONALIZAR COM ÁREA
-                        if "{area}" in next_question and "step_3" in lead_data:
-                            area = lead_data["step_3"]
-                            next_question = next_question.replace("{area}", area)
+                        # ✅ PERSONALIZAR COM NOME E ÁREA
+                        next_question = _personalize(next_question_data["question"], lead_data)
                         
                         # ✅ ATUALIZAR SESSÃO
                         session_data["current_step"] = next_step
@@ -566,7 +803,7 @@ class IntelligentHybridOrchestrator:
                         session_data["last_updated"] = datetime.now().isoformat()
                         
                         # ✅ SALVAR SESSÃO (ASYNC)
-                        asyncio.create_task(self._save_session_async(session_id, session_data, correlation_id))
+                        self._schedule_session_save(session_id, session_data, correlation_id)
                         
                         return {
                             "session_id": session_id,
@@ -581,25 +818,20 @@ class IntelligentHybridOrchestrator:
                         }
                 
                 # ✅ FLUXO COMPLETO - COLETAR TELEFONE
-                logger.info(f"🎯 [{correlation_id}] Fluxo completo - coletar telefone")
+                logger.info("🎯 Fluxo completo - coletar telefone")
                 
                 session_data["flow_completed"] = True
                 session_data["lead_data"] = lead_data
                 session_data["last_updated"] = datetime.now().isoformat()
                 
                 # ✅ SALVAR SESSÃO (ASYNC)
-                asyncio.create_task(self._save_session_async(session_id, session_data, correlation_id))
-                
-                completion_message = flow.get("completion_message", "Perfeito! Para finalizar, preciso do seu WhatsApp:")
+                self._schedule_session_save(session_id, session_data, correlation_id)
                 
                 # ✅ PERSONALIZAR MENSAGEM DE CONCLUSÃO
-                if "{user_name}" in completion_message and "step_1" in lead_data:
-                    user_name = lead_data["step_1"].split()[0]
-                    completion_message = completion_message.replace("{user_name}", user_name)
-                
-                if "{area}" in completion_message and "step_3" in lead_data:
-                    area = lead_data["step_3"]
-                    completion_message = completion_message.replace("{area}", area)
+                completion_message = _personalize(
+                    flow.get("completion_message", "Perfeito! Para finalizar, preciso do seu WhatsApp:"),
+                    lead_data
+                )
                 
                 return {
                     "session_id": session_id,
@@ -614,7 +846,7 @@ class IntelligentHybridOrchestrator:
                 }
             
             # ✅ FALLBACK GENÉRICO
-            logger.warning(f"⚠️ [{correlation_id}] Step inválido: {current_step}")
+            logger.warning(f"⚠️ Step inválido: {current_step}")
             
             return {
                 "session_id": session_id,
@@ -628,7 +860,7 @@ class IntelligentHybridOrchestrator:
             }
             
         except Exception as e:
-            logger.error(f"❌ [{correlation_id}] Erro no fallback Firebase: {str(e)}")
+            logger.error(f"❌ Erro no fallback Firebase: {str(e)}")
             
             return {
                 "session_id": session_data.get("session_id", "error"),
@@ -642,6 +874,62 @@ class IntelligentHybridOrchestrator:
                 "correlation_id": correlation_id
             }
 
+    async def _cached_flow(self) -> Dict[str, Any]:
+        """
+        Fluxo de conversa com cache de FLOW_CACHE_TTL segundos.
+
+        Chamadas concorrentes com o cache vencido esperam a mesma busca no
+        Firebase. Falhas não são cacheadas: o erro vai para todos que
+        esperavam e a próxima chamada tenta de novo.
+        """
+        cache = self._flow_cache
+        if cache["data"] is not None and time.monotonic() < cache["expires"]:
+            return cache["data"]
+
+        loading = cache["loading"]
+        if loading is None:
+            loading = cache["loading"] = asyncio.create_task(self._load_flow())
+        return await asyncio.shield(loading)
+
+    async def _load_flow(self) -> Dict[str, Any]:
+        cache = self._flow_cache
+        try:
+            flow = await asyncio.wait_for(get_conversation_flow(), timeout=self.firebase_timeout)
+            cache["by_id"] = _index_steps(flow)
+            cache["data"] = flow
+            cache["expires"] = time.monotonic() + FLOW_CACHE_TTL
+            return flow
+        finally:
+            cache["loading"] = None
+
+    def _steps_by_id(self, flow: Dict[str, Any]) -> Dict[Any, Dict[str, Any]]:
+        """Índice por id do fluxo: o do cache, o do fluxo padrão ou montado na hora."""
+        if flow is self._flow_cache["data"]:
+            return self._flow_cache["by_id"]
+        if flow is _DEFAULT_FLOW:
+            return _DEFAULT_STEPS_BY_ID
+        return _index_steps(flow)
+
+    async def warm_up(self):
+        """
+        Aquece o caminho de fallback no boot: a primeira leitura abre o canal
+        gRPC do Firestore (handshake TLS/HTTP2) e já preenche o cache do fluxo,
+        tirando esse custo da primeira mensagem real.
+        """
+        try:
+            flow = await self._cached_flow()
+            logger.info(f"🔥 Orquestrador aquecido: fluxo com {len(flow.get('steps', []))} steps em cache")
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao aquecer o orquestrador: {str(e)}")
+
+    def invalidate_flow_cache(self) -> bool:
+        """Descarta o fluxo em cache; retorna se havia algo cacheado."""
+        was_cached = self._flow_cache["data"] is not None
+        self._flow_cache["data"] = None
+        self._flow_cache["by_id"] = {}
+        self._flow_cache["expires"] = 0.0
+        return was_cached
+
     def _should_advance_step(self, answer: str, step_id: int) -> bool:
         """Validação básica para avançar step."""
         answer = answer.strip()
@@ -670,12 +958,11 @@ class IntelligentHybridOrchestrator:
             session_id = session_data["session_id"]
             lead_data = self.safe_get_lead_data(session_data)  # ✅ SEMPRE DICT VÁLIDO
             
-            logger.info(f"📱 [{correlation_id}] Coletando telefone")
+            logger.info("📱 Coletando telefone")
             
             # ✅ VALIDAR TELEFONE
-            if self._is_phone_number(phone_message):
-                clean_phone = self._format_brazilian_phone(phone_message)
-                
+            clean_phone = self._parse_phone(phone_message)
+            if clean_phone:
                 # ✅ SALVAR TELEFONE
                 lead_data["phone"] = clean_phone
                 session_data["phone_submitted"] = True
@@ -683,16 +970,14 @@ class IntelligentHybridOrchestrator:
                 session_data["last_updated"] = datetime.now().isoformat()
                 
                 # ✅ SALVAR SESSÃO (ASYNC)
-                asyncio.create_task(self._save_session_async(session_id, session_data, correlation_id))
-                
-                # ✅ SALVAR LEAD (ASYNC)
-                asyncio.create_task(self._save_lead_async(lead_data, correlation_id))
-                
-                # ✅ ENVIAR WHATSAPP PARA USUÁRIO (ASYNC)
-                asyncio.create_task(self._send_user_whatsapp_async(lead_data, clean_phone, correlation_id))
+                self._schedule_session_save(session_id, session_data, correlation_id)
                 
-                # ✅ NOTIFICAR ADVOGADOS (ASYNC)
-                asyncio.create_task(self._notify_lawyers_async(lead_data, correlation_id))
+                # ✅ SALVAR LEAD + WHATSAPP PARA USUÁRIO + NOTIFICAR ADVOGADOS EM BACKGROUND
+                # (a resposta não espera o envio aos advogados nem segura o lock da sessão)
+                task = asyncio.create_task(self._finalize_lead_async(lead_data, clean_phone, correlation_id))
+                self._lead_tasks.add(task)
+                task.add_done_callback(self._lead_tasks.discard)
+                self._cleanup_session(session_id)
                 
                 return {
                     "session_id": session_id,
@@ -701,9 +986,11 @@ class IntelligentHybridOrchestrator:
                     "flow_completed": True,
                     "phone_submitted": True,
                     "phone_number": clean_phone,
-                    "lead_saved": True,
-                    "whatsapp_sent": True,
-                    "lawyers_notified": True,
+                    # Resultado ainda desconhecido: a finalização segue em background
+                    "lead_saved": None,
+                    "whatsapp_sent": None,
+                    "lawyers_notified": None,
+                    "lead_processing": "pending",
                     "lead_data": lead_data,
                     "correlation_id": correlation_id
                 }
@@ -720,7 +1007,7 @@ class IntelligentHybridOrchestrator:
                 }
                 
         except Exception as e:
-            logger.error(f"❌ [{correlation_id}] Erro na coleta de telefone: {str(e)}")
+            logger.error(f"❌ Erro na coleta de telefone: {str(e)}")
             
             return {
                 "session_id": session_data.get("session_id", "error"),
@@ -733,50 +1020,149 @@ class IntelligentHybridOrchestrator:
                 "correlation_id": correlation_id
             }
 
-    async def _save_session_async(self, session_id: str, session_data: Dict[str, Any], correlation_id: str):
+    async def _finalize_lead_async(self, lead_data: Dict[str, Any], phone: str, correlation_id: str):
+        """Salva o lead, confirma ao usuário e notifica advogados em paralelo, registrando o resultado."""
+        lead_saved, whatsapp_sent, lawyers_notified = (
+            result is True for result in await asyncio.gather(
+                self._save_lead_async(lead_data, correlation_id),
+                self._send_user_whatsapp_async(lead_data, phone, correlation_id),
+                self._notify_lawyers_async(lead_data, correlation_id),
+                return_exceptions=True
+            )
+        )
+        summary = (
+            f"lead_saved={lead_saved} whatsapp_sent={whatsapp_sent} "
+            f"lawyers_notified={lawyers_notified}"
+        )
+        if lead_saved and whatsapp_sent and lawyers_notified:
+            logger.info(f"📋 Lead finalizado: {summary}")
+        else:
+            logger.warning(f"⚠️ Lead finalizado com falhas: {summary}")
+
+    def _cleanup_session(self, session_id: str):
+        """
+        Libera o estado em memória de uma sessão concluída.
+
+        O lock sai sozinho do dict quando o último usuário solta (contagem em
+        session_locks) e os digests expiram no TTLCache; aqui sobra só a janela
+        local de rate limit, que cresceria por sessão sem nunca ser removida.
+        """
+        self.message_counts.pop(session_id, None)
+
+    @asynccontextmanager
+    async def _session_guard(self, session_id: str):
+        """
+        Serializa o processamento de mensagens da mesma sessão.
+
+        Quem entra espera a gravação pendente da mensagem anterior, garantindo
+        que get_user_session já enxergue o estado salvo.
+        """
+        entry = self.session_locks.get(session_id)
+        if entry is None:
+            entry = self.session_locks[session_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                pending = self._pending_saves.get(session_id)
+                if pending is not None:
+                    # shield: cancelar esta requisição não cancela a gravação anterior
+                    await asyncio.shield(pending)
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self.session_locks.pop(session_id, None)
+
+    @staticmethod
+    def _session_digest(session_data: Dict[str, Any]) -> int:
+        """Hash dos campos persistidos relevantes (ordem de chaves estável)."""
+        return hash(orjson.dumps(
+            {field: session_data.get(field) for field in _SESSION_DIGEST_FIELDS},
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+            default=str
+        ))
+
+    def _invalidate_session_context(self, session_id: str):
+        """Descarta o contexto memoizado da sessão após uma gravação."""
+        self._session_context_cache.pop(session_id, None)
+
+    def _schedule_session_save(self, session_id: str, session_data: Dict[str, Any], correlation_id: str):
+        """Agenda a gravação da sessão em background e registra como pendente."""
+        digest = self._session_digest(session_data)
+        if self._saved_digests.get(session_id) == digest:
+            logger.debug(f"⏭️ Sessão sem mudanças, gravação ignorada: {session_id}")
+            return
+
+        task = asyncio.create_task(self._save_session_async(session_id, session_data, correlation_id, digest))
+        self._pending_saves[session_id] = task
+
+        def _clear(done: asyncio.Task, sid: str = session_id):
+            if self._pending_saves.get(sid) is done:
+                del self._pending_saves[sid]
+
+        task.add_done_callback(_clear)
+
+    async def _save_session_async(
+        self, session_id: str, session_data: Dict[str, Any], correlation_id: str, digest: Optional[int] = None
+    ):
         """Salvar sessão de forma assíncrona."""
         try:
-            await asyncio.wait_for(
+            saved = await asyncio.wait_for(
                 save_user_session(session_id, session_data),
                 timeout=self.firebase_timeout
             )
-            logger.info(f"💾 [{correlation_id}] Sessão salva: {session_id}")
+            # Os stores registram o erro e retornam False sem levantar: só uma
+            # gravação confirmada atualiza o digest (senão a próxima seria pulada)
+            if not saved:
+                logger.warning(f"⚠️ Sessão não salva: {session_id}")
+                return
+            if digest is not None:
+                self._saved_digests[session_id] = digest
+            self._invalidate_session_context(session_id)
+            logger.info(f"💾 Sessão salva: {session_id}")
         except Exception as e:
-            logger.error(f"❌ [{correlation_id}] Erro ao salvar sessão: {str(e)}")
+            logger.error(f"❌ Erro ao salvar sessão: {str(e)}")
 
-    async def _save_lead_async(self, lead_data: Dict[str, Any], correlation_id: str):
+    async def _save_lead_async(self, lead_data: Dict[str, Any], correlation_id: str) -> bool:
         """Salvar lead de forma assíncrona."""
         try:
             await asyncio.wait_for(
                 save_lead_data({"answers": lead_data}),
                 timeout=self.firebase_timeout
             )
-            logger.info(f"💾 [{correlation_id}] Lead salvo")
+            logger.info("💾 Lead salvo")
+            return True
         except Exception as e:
-            logger.error(f"❌ [{correlation_id}] Erro ao salvar lead: {str(e)}")
+            logger.error(f"❌ Erro ao salvar lead: {str(e)}")
+            return False
 
-    async def _send_user_whatsapp_async(self, lead_data: Dict[str, Any], phone: str, correlation_id: str):
+    async def _send_user_whatsapp_async(self, lead_data: Dict[str, Any], phone: str, correlation_id: str) -> bool:
         """Enviar WhatsApp para usuário de forma assíncrona."""
         try:
             user_name = lead_data.get("step_1", "Cliente")
-            user_message = f"Olá {user_name}! 👋\n\nObrigado por entrar em contato com o m.lima.\n\nSuas informações foram registradas e em breve um de nossos advogados especializados entrará em contato.\n\nFique tranquilo, você está em boas mãos! 🤝"
+            user_message = USER_CONFIRMATION_MESSAGE.format(user_name=user_name)
             
-            await asyncio.wait_for(
-                baileys_service.send_whatsapp_message(phone, user_message),
+            sent = await asyncio.wait_for(
+                send_baileys_message(phone, user_message),
                 timeout=self.whatsapp_timeout
             )
-            logger.info(f"📤 [{correlation_id}] WhatsApp enviado para usuário: {phone}")
+            if not sent:
+                logger.warning(f"⚠️ WhatsApp para usuário não enviado: {phone}")
+                return False
+            logger.info(f"📤 WhatsApp enviado para usuário: {phone}")
+            return True
         except Exception as e:
-            logger.error(f"❌ [{correlation_id}] Erro ao enviar WhatsApp para usuário: {str(e)}")
+            logger.error(f"❌ Erro ao enviar WhatsApp para usuário: {str(e)}")
+            return False
 
-    async def _notify_lawyers_async(self, lead_data: Dict[str, Any], correlation_id: str):
+    async def _notify_lawyers_async(self, lead_data: Dict[str, Any], correlation_id: str) -> bool:
         """Notificar advogados de forma assíncrona."""
         try:
             user_name = lead_data.get("step_1", "Cliente")
             phone = lead_data.get("phone", "")
             area = lead_data.get("step_3", "")
             
-            await asyncio.wait_for(
+            notification = await asyncio.wait_for(
                 lawyer_notification_service.notify_lawyers_of_new_lead(
                     lead_name=user_name,
                     lead_phone=phone,
@@ -785,38 +1171,89 @@ class IntelligentHybridOrchestrator:
                 ),
                 timeout=self.notification_timeout
             )
-            logger.info(f"👨‍⚖️ [{correlation_id}] Advogados notificados")
+            if isinstance(notification, dict) and notification.get("success") is False:
+                logger.warning(f"⚠️ Notificação de advogados falhou: {notification.get('error')}")
+                return False
+            logger.info("👨‍⚖️ Advogados notificados")
+            return True
         except Exception as e:
-            logger.error(f"❌ [{correlation_id}] Erro ao notificar advogados: {str(e)}")
+            logger.error(f"❌ Erro ao notificar advogados: {str(e)}")
+            return False
 
-    def _is_rate_limited(self, session_id: str) -> bool:
-        """Rate limiting por sessão."""
-        now = datetime.now()
-        cutoff = now - timedelta(minutes=1)
-        
-        # ✅ LIMPAR MENSAGENS ANTIGAS
-        self.message_counts[session_id] = [
-            msg_time for msg_time in self.message_counts[session_id] 
-            if msg_time > cutoff
-        ]
+    async def _is_rate_limited(self, session_id: str) -> bool:
+        """Rate limiting por sessão (janela deslizante de 1 minuto)."""
+        if _rate_limit_script is not None:
+            try:
+                if RATE_LIMIT_MODE == "approx":
+                    now = int(time.time())
+                    window, elapsed = divmod(now, RATE_LIMIT_WINDOW_S)
+                    key = f"{RATE_LIMIT_KEY_PREFIX}{session_id}:"
+                    limited = await _rate_limit_script(
+                        keys=[f"{key}{window}", f"{key}{window - 1}"],
+                        args=[elapsed, self.max_messages_per_minute, RATE_LIMIT_WINDOW_S]
+                    )
+                else:
+                    now_ms = int(time.time() * 1000)
+                    limited = await _rate_limit_script(
+                        keys=[RATE_LIMIT_KEY_PREFIX + session_id],
+                        # membro único: duas mensagens no mesmo ms contam separadas
+                        args=[now_ms, RATE_LIMIT_WINDOW_MS, self.max_messages_per_minute,
+                              f"{now_ms}-{secrets.token_hex(4)}"]
+                    )
+                return bool(limited)
+            except Exception as e:
+                logger.warning(f"⚠️ Rate limit Redis indisponível, usando janela local: {str(e)}")
+
+        return self._is_rate_limited_local(session_id)
+
+    def _is_rate_limited_local(self, session_id: str) -> bool:
+        """
+        Rate limiting por sessão em memória (sem Redis).
+
+        Mesma janela deslizante aproximada do modo "approx" do Redis: dois
+        contadores de janela fixa, com a anterior ponderada pelo tempo que
+        ainda cobre. Memória e custo constantes por sessão.
+        """
+        now = time.monotonic()
+        current = int(now // RATE_LIMIT_WINDOW_S)
+        state = self.message_counts.get(session_id)
+        if state is None:
+            state = self.message_counts[session_id] = [current, 0, 0]
+        elif state[0] != current:
+            # Virou a janela: a atual vira a anterior (ou zera, se pulou mais de uma)
+            state[1] = state[2] if state[0] == current - 1 else 0
+            state[0] = current
+            state[2] = 0
         
-        if len(self.message_counts[session_id]) >= self.max_messages_per_minute:
+        weight = 1.0 - (now - current * RATE_LIMIT_WINDOW_S) / RATE_LIMIT_WINDOW_S
+        if state[1] * weight + state[2] + 1 > self.max_messages_per_minute:
             return True
         
-        self.message_counts[session_id].append(now)
+        state[2] += 1
         return False
 
+    def _parse_phone(self, text: str) -> Optional[str]:
+        """
+        Valida e normaliza o telefone em uma única extração de dígitos.
+
+        Retorna o número com o código do Brasil (55) ou None se inválido.
+        """
+        digits = digits_only(text)
+        n = len(digits)
+        if not (_PHONE_LENGTHS_MASK >> n) & 1:
+            return None
+        # Com 12 ou 13 dígitos o número precisa já trazer o código do Brasil
+        if n >= 12:
+            return digits if digits[:2] == "55" else None
+        return "55" + digits
+
     def _is_phone_number(self, text: str) -> bool:
         """Validar se texto é um número de telefone."""
-        clean = re.sub(r'[^\d]', '', text)
-        return 10 <= len(clean) <= 13
+        return self._parse_phone(text) is not None
 
     def _format_brazilian_phone(self, phone: str) -> str:
         """Formatar telefone brasileiro."""
-        clean = re.sub(r'[^\d]', '', phone)
-        if not clean.startswith("55"):
-            clean = f"55{clean}"
-        return clean
+        return self._parse_phone(phone) or ""
 
     async def get_session_context(self, session_id: str) -> Dict[str, Any]:
         """
@@ -827,6 +1264,10 @@ class IntelligentHybridOrchestrator:
         - lead_data sempre presente
         - Correção automática de sessões antigas
         """
+        cached = self._session_context_cache.get(session_id)
+        if cached is not None:
+            return cached
+
         try:
             session_data = await asyncio.wait_for(
                 get_user_session(session_id),
@@ -850,22 +1291,28 @@ class IntelligentHybridOrchestrator:
             
             # ✅ GARANTIR INTEGRIDADE
             session_data = await self._ensure_session_integrity(session_id, session_data)
+            merged = _SESSION_DEFAULTS | session_data
+            current_step = merged["current_step"]
+            flow_completed = merged["flow_completed"]
+            phone_submitted = merged["phone_submitted"]
             
-            return {
+            context = {
                 "session_id": session_id,
                 "status_info": {
-                    "step": session_data.get("current_step", 1),
-                    "flow_completed": session_data.get("flow_completed", False),
-                    "phone_submitted": session_data.get("phone_submitted", False),
+                    "step": current_step,
+                    "flow_completed": flow_completed,
+                    "phone_submitted": phone_submitted,
                     "state": "active"
                 },
                 "lead_data": self.safe_get_lead_data(session_data),  # ✅ SEMPRE VÁLIDO
-                "current_step": session_data.get("current_step", 1),
-                "flow_completed": session_data.get("flow_completed", False),
-                "phone_submitted": session_data.get("phone_submitted", False),
-                "message_count": session_data.get("message_count", 0),
-                "gemini_available": session_data.get("gemini_available", True)
+                "current_step": current_step,
+                "flow_completed": flow_completed,
+                "phone_submitted": phone_submitted,
+                "message_count": merged["message_count"],
+                "gemini_available": merged["gemini_available"]
             }
+            self._session_context_cache[session_id] = context
+            return context
             
         except asyncio.TimeoutError:
             logger.warning(f"⏰ Timeout ao buscar contexto da sessão: {session_id}")
@@ -899,26 +1346,23 @@ class IntelligentHybridOrchestrator:
                 "error": str(e)
             }
 
-    async def get_overall_service_status(self) -> Dict[str, Any]:
-        """Status geral do serviço."""
+    async def get_overall_service_status(self, use_cache: bool = True) -> Dict[str, Any]:
+        """Status geral do serviço (memoizado por STATUS_CACHE_TTL; use_cache=False força refresh)."""
+        now = time.monotonic()
+        cached = self._status_cache
+        if use_cache and cached is not None and now < cached[0]:
+            return cached[1]
+
         try:
-            return {
-                "overall_status": "active",
-                "ai_status": "active" if self.gemini_available else "quota_exceeded",
-                "firebase_status": "active",
-                "gemini_available": self.gemini_available,
-                "fallback_mode": not self.gemini_available,
-                "features": [
-                    "intelligent_conversation_flow",
-                    "ai_first_fallback_second",
-                    "automatic_lead_collection",
-                    "whatsapp_integration",
-                    "lawyer_notifications",
-                    "session_management",
-                    "rate_limiting",
-                    "auto_restart_capability"
-                ]
+            gemini_available = self.gemini_available
+            status = {
+                **_STATUS_TEMPLATE,
+                "ai_status": "active" if gemini_available else "quota_exceeded",
+                "gemini_available": gemini_available,
+                "fallback_mode": not gemini_available
             }
+            self._status_cache = (now + STATUS_CACHE_TTL, status)
+            return status
         except Exception as e:
             return {
                 "overall_status": "degraded",
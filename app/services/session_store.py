@@ -0,0 +1,61 @@
+"""
+Session Store
+
+Sessões de conversa do orquestrador. Com REDIS_URL configurado, o estado
+efêmero da conversa fica em um hash do Redis (sess:flow:<session_id>, TTL de
+1h), lido com HGETALL e gravado com HSET + EXPIRE em um único pipeline. Sem
+Redis, delega para o Firestore como antes. O lead final continua sendo
+persistido no Firestore (save_lead_data).
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+import orjson
+
+from app.services import firebase_service
+from app.services.ai_chain import redis_client
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY_PREFIX = "sess:flow:"
+SESSION_TTL = 3600  # seconds
+
+
+async def get_user_session(session_id: str) -> Optional[Dict[str, Any]]:
+    """Busca a sessão no Redis (ou no Firestore quando Redis não está configurado)."""
+    if redis_client is None:
+        return await firebase_service.get_user_session(session_id)
+
+    try:
+        raw = await redis_client.hgetall(SESSION_KEY_PREFIX + session_id)
+    except Exception as e:
+        logger.error("❌ Erro ao buscar sessão %s no Redis: %s", session_id, e)
+        return None
+    if not raw:
+        return None
+    # Cada campo é JSON: tipos (bool, int, dict do lead_data) voltam intactos
+    return {key.decode(): orjson.loads(value) for key, value in raw.items()}
+
+
+async def save_user_session(session_id: str, session_data: Dict[str, Any]) -> bool:
+    """Grava (merge) a sessão no Redis com TTL, ou no Firestore sem Redis."""
+    if redis_client is None:
+        return await firebase_service.save_user_session(session_id, session_data)
+
+    key = SESSION_KEY_PREFIX + session_id
+    session_data["last_updated"] = datetime.now().isoformat()
+    if "created_at" not in session_data:
+        session_data["created_at"] = session_data["last_updated"]
+    mapping = {field: orjson.dumps(value, default=str) for field, value in session_data.items()}
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, SESSION_TTL)
+            await pipe.execute()
+        return True
+    except Exception as e:
+        logger.error("❌ Erro ao salvar sessão %s no Redis: %s", session_id, e)
+        return False
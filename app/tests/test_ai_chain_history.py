@@ -0,0 +1,94 @@
+"""
+Unit tests for the shared (Redis) conversation history and the response cache.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from langchain.schema import HumanMessage, AIMessage
+
+from app.services import ai_chain
+from app.services.ai_chain import AIOrchestrator, _encode_message, load_history
+
+
+class TestLoadHistory:
+    """Redis is the source of truth when configured."""
+
+    @pytest.mark.asyncio
+    async def test_sees_turns_saved_by_another_replica(self):
+        """A session already in the local LRU is still refreshed from Redis."""
+        session_id = "replica_test"
+        ai_chain.get_conversation_memory(session_id).chat_memory.messages[:] = [
+            HumanMessage(content="oi"), AIMessage(content="olá")
+        ]
+        stored = [_encode_message(m) for m in (
+            HumanMessage(content="oi"), AIMessage(content="olá"),
+            HumanMessage(content="outra réplica"), AIMessage(content="resposta")
+        )]
+        redis = MagicMock()
+        redis.lrange = AsyncMock(return_value=stored)
+
+        with patch.object(ai_chain, "redis_client", redis):
+            messages = await load_history(session_id)
+
+        assert [m.content for m in messages] == ["oi", "olá", "outra réplica", "resposta"]
+        del ai_chain.conversation_memories[session_id]
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_local_copy_on_redis_error(self):
+        """A Redis failure serves the in-process copy unchanged."""
+        session_id = "replica_fallback"
+        ai_chain.get_conversation_memory(session_id).chat_memory.messages[:] = [HumanMessage(content="oi")]
+        redis = MagicMock()
+        redis.lrange = AsyncMock(side_effect=ConnectionError("down"))
+
+        with patch.object(ai_chain, "redis_client", redis):
+            messages = await load_history(session_id)
+
+        assert [m.content for m in messages] == ["oi"]
+        del ai_chain.conversation_memories[session_id]
+
+
+
+def history(first_name: str) -> list:
+    return [
+        HumanMessage(content=first_name), AIMessage(content="Prazer! Qual o seu telefone?"),
+        HumanMessage(content="11999999999"), AIMessage(content="Qual a área?"),
+        HumanMessage(content="Penal"), AIMessage(content="Descreva sua situação:"),
+    ]
+
+
+class TestResponseCache:
+    """Cached replies are keyed by the whole history sent to Gemini."""
+
+    def make_orchestrator(self, *responses) -> AIOrchestrator:
+        orchestrator = AIOrchestrator()
+        orchestrator.chain = MagicMock()
+        orchestrator.chain.ainvoke = AsyncMock(side_effect=list(responses))
+        return orchestrator
+
+    @pytest.mark.asyncio
+    async def test_different_earlier_history_is_not_shared(self):
+        """Sessions with the same last 4 messages but different names get their own reply."""
+        orchestrator = self.make_orchestrator("Certo, Maria.", "Certo, João.")
+
+        first = await orchestrator._cached_invoke("Fui preso", history("Maria Souza"))
+        second = await orchestrator._cached_invoke("Fui preso", history("João Silva"))
+
+        assert (first, second) == ("Certo, Maria.", "Certo, João.")
+        assert orchestrator.chain.ainvoke.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_identical_history_reuses_reply(self):
+        """The same input over the same full history hits the cache."""
+        orchestrator = self.make_orchestrator("Certo, Maria.")
+
+        await orchestrator._cached_invoke("Fui preso", history("Maria Souza"))
+        cached = await orchestrator._cached_invoke("Fui preso", history("Maria Souza"))
+
+        assert cached == "Certo, Maria."
+        assert orchestrator.chain.ainvoke.await_count == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
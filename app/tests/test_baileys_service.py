@@ -0,0 +1,122 @@
+"""
+Unit tests for the Baileys send queue, batch dispatch, circuit breaker and
+per-loop service lifecycle.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from unittest.mock import AsyncMock
+
+from app.services import baileys_service as baileys_module
+from app.services.baileys_service import (
+    BaileysWhatsAppService,
+    CIRCUIT_FAILURE_THRESHOLD,
+    cleanup_baileys_services,
+    get_baileys_service,
+)
+
+PHONE = "5511999999999"
+
+
+def make_service(handler) -> BaileysWhatsAppService:
+    """Service with the batch endpoint enabled and a mocked VM transport."""
+    service = BaileysWhatsAppService(base_url="http://vm.test")
+    service.batch_endpoint = "/send-messages"
+    service._client = httpx.AsyncClient(base_url="http://vm.test", transport=httpx.MockTransport(handler))
+    return service
+
+
+def raise_read_error(request: httpx.Request):
+    raise httpx.ReadError("connection reset", request=request)
+
+
+class TestBatchDispatchErrors:
+    """Transport errors in the batch POST must resolve every queued send."""
+
+    @pytest.mark.asyncio
+    async def test_read_error_resolves_batched_sends(self):
+        """A ReadError on the batch POST fails both sends instead of hanging."""
+        service = make_service(raise_read_error)
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(
+                    service.send_whatsapp_message(PHONE, "um"),
+                    service.send_whatsapp_message(PHONE, "dois"),
+                ),
+                timeout=2.0
+            )
+            assert results == [False, False]
+            assert service._failures == 1
+            assert not service.connection_healthy
+        finally:
+            await service.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_failed_probe_in_batch_releases_breaker(self):
+        """The half-open probe is released when the batch carrying it fails."""
+        service = make_service(raise_read_error)
+        service._failures = CIRCUIT_FAILURE_THRESHOLD
+        assert service._circuit_allows()  # cooldown vencido: libera o envio de teste
+        loop = asyncio.get_running_loop()
+        batch = [(PHONE, "teste", loop.create_future()), (PHONE, "outra", loop.create_future())]
+        try:
+            await asyncio.wait_for(service._dispatch_batch(batch), timeout=2.0)
+            assert [future.result() for _, _, future in batch] == [False, False]
+            assert service._probe_in_flight is False
+            assert not service._circuit_allows()  # próximo teste só após o intervalo
+        finally:
+            await service.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_unexpected_dispatch_error_resolves_futures(self, monkeypatch):
+        """Any exception escaping the dispatch still resolves pending futures with False."""
+        service = make_service(raise_read_error)
+
+        async def broken_post_batch(self, batch):
+            raise RuntimeError("boom")
+
+        # __slots__: o método é trocado na classe, não na instância
+        monkeypatch.setattr(BaileysWhatsAppService, "_post_batch", broken_post_batch)
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(
+                    service.send_whatsapp_message(PHONE, "um"),
+                    service.send_whatsapp_message(PHONE, "dois"),
+                ),
+                timeout=2.0
+            )
+            assert results == [False, False]
+            assert service._failures == 1
+        finally:
+            await service.cleanup()
+
+
+
+class TestServiceLifecycle:
+    """get_baileys_service initializes lazily; shutdown cleans every instance."""
+
+    @pytest.mark.asyncio
+    async def test_accessor_initializes_and_shutdown_cleans_up(self, monkeypatch):
+        initialize = AsyncMock(return_value=True)
+        cleanup = AsyncMock()
+        monkeypatch.setattr(BaileysWhatsAppService, "initialize", initialize)
+        monkeypatch.setattr(BaileysWhatsAppService, "cleanup", cleanup)
+        monkeypatch.setattr(baileys_module, "_services", baileys_module.weakref.WeakKeyDictionary())
+        monkeypatch.setattr(baileys_module, "_default_bound", False)
+
+        service = await get_baileys_service()
+        assert service is baileys_module.baileys_service
+        assert await get_baileys_service() is service
+        initialize.assert_awaited_once()
+
+        await cleanup_baileys_services()
+        cleanup.assert_awaited_once()
+        assert len(baileys_module._services) == 0
+        assert baileys_module._default_bound is False
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
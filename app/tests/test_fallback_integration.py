@@ -29,10 +29,11 @@ class TestFirebaseFallbackIntegration:
 
     @pytest.fixture
     def mock_baileys_service(self):
-        """Mock Baileys WhatsApp service."""
-        with patch('app.services.orchestration_service.baileys_service') as mock:
-            mock.send_whatsapp_message = AsyncMock(return_value=True)
-            yield mock
+        """Mock Baileys WhatsApp sends (user confirmation and lawyer notifications)."""
+        send = AsyncMock(return_value=True)
+        with patch('app.services.orchestration_service.send_baileys_message', new=send), \
+             patch('app.services.lead_assignment_service.send_baileys_message', new=send):
+            yield MagicMock(send_whatsapp_message=send)
 
     @pytest.fixture
     def mock_firebase_services(self, mock_conversation_flow):
@@ -283,6 +284,8 @@ class TestFirebaseFallbackIntegration:
         assert not orchestrator._is_phone_number("123")
         assert not orchestrator._is_phone_number("abc")
         assert not orchestrator._is_phone_number("11999")
+        assert not orchestrator._is_phone_number("11999999999999")
+        assert not orchestrator._is_phone_number("441199999999")
 
     def test_quota_error_detection(self):
         """Test quota error detection logic."""
@@ -0,0 +1,200 @@
+"""
+Unit tests for the orchestrator's in-memory state and routing shortcuts.
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from app.services.orchestration_service import IntelligentHybridOrchestrator, CONTACT_STEP
+
+
+def make_session(session_id: str = "sess_1", step: int = 1) -> dict:
+    return {"session_id": session_id, "current_step": step, "lead_data": {}, "message_count": 0}
+
+
+class TestSessionSaveDigest:
+    """The saved digest only tracks writes the store confirmed."""
+
+    @pytest.mark.asyncio
+    async def test_failed_save_does_not_record_digest(self):
+        """A store returning False keeps the next identical state writable."""
+        orchestrator = IntelligentHybridOrchestrator()
+        session = make_session()
+
+        with patch('app.services.orchestration_service.save_user_session',
+                   new=AsyncMock(return_value=False)) as mock_save:
+            orchestrator._schedule_session_save("sess_1", session, "cid")
+            await orchestrator._pending_saves["sess_1"]
+            assert "sess_1" not in orchestrator._saved_digests
+
+            mock_save.return_value = True
+            orchestrator._schedule_session_save("sess_1", session, "cid")
+            await orchestrator._pending_saves["sess_1"]
+
+        assert mock_save.await_count == 2
+        assert orchestrator._saved_digests["sess_1"] == orchestrator._session_digest(session)
+
+    @pytest.mark.asyncio
+    async def test_unchanged_state_skips_write(self):
+        """After a confirmed write, the same state is not written again."""
+        orchestrator = IntelligentHybridOrchestrator()
+        session = make_session()
+
+        with patch('app.services.orchestration_service.save_user_session',
+                   new=AsyncMock(return_value=True)) as mock_save:
+            orchestrator._schedule_session_save("sess_1", session, "cid")
+            await orchestrator._pending_saves["sess_1"]
+            orchestrator._schedule_session_save("sess_1", session, "cid")
+
+        assert mock_save.await_count == 1
+        assert "sess_1" not in orchestrator._pending_saves
+
+
+class TestPhoneFastPath:
+    """Phone-shaped messages skip Gemini only on the contact step."""
+
+    async def _process(self, step: int):
+        orchestrator = IntelligentHybridOrchestrator()
+        gemini = AsyncMock(return_value={"success": False})
+        fallback = AsyncMock(return_value={"response": "ok"})
+        with patch('app.services.orchestration_service.get_user_session',
+                   new=AsyncMock(return_value=make_session("sess_fast", step))), \
+             patch.object(orchestrator, "_attempt_gemini_response", gemini), \
+             patch.object(orchestrator, "_get_fallback_response", fallback):
+            await orchestrator.process_message("11999999999", "sess_fast")
+        return gemini, fallback
+
+    @pytest.mark.asyncio
+    async def test_contact_step_skips_gemini(self):
+        """On the contact step the number goes straight to the structured flow."""
+        gemini, fallback = await self._process(step=CONTACT_STEP)
+        gemini.assert_not_awaited()
+        fallback.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_other_steps_still_try_gemini(self):
+        """On any other step a phone-shaped message follows the normal path."""
+        gemini, _ = await self._process(step=1)
+        gemini.assert_awaited_once()
+
+
+class TestLeadFinalization:
+    """Completing a lead does not wait for the save/WhatsApp/lawyer fan-out."""
+
+    @pytest.mark.asyncio
+    async def test_phone_collection_returns_before_notifications(self):
+        orchestrator = IntelligentHybridOrchestrator()
+        release = asyncio.Event()
+
+        async def slow_notify(lead_data, correlation_id):
+            await release.wait()
+            return True
+
+        session = {**make_session("sess_lead", step=5), "flow_completed": True, "phone_submitted": False}
+        with patch('app.services.orchestration_service.save_user_session', new=AsyncMock(return_value=True)), \
+             patch.object(orchestrator, "_save_lead_async", AsyncMock(return_value=True)), \
+             patch.object(orchestrator, "_send_user_whatsapp_async", AsyncMock(return_value=True)), \
+             patch.object(orchestrator, "_notify_lawyers_async", slow_notify):
+            result = await asyncio.wait_for(
+                orchestrator._handle_phone_collection(session, "11999999999", "cid"), timeout=1.0
+            )
+            assert result["response_type"] == "phone_collected_fallback"
+            assert result["lead_processing"] == "pending"
+            assert result["lawyers_notified"] is None
+            assert len(orchestrator._lead_tasks) == 1
+
+            release.set()
+            await asyncio.gather(*orchestrator._lead_tasks)
+
+        assert not orchestrator._lead_tasks
+
+
+class TestLocalRateLimit:
+    """Two-counter sliding window used when Redis is not configured."""
+
+    def _allowed(self, orchestrator, now: float, count: int) -> int:
+        with patch('app.services.orchestration_service.time.monotonic', return_value=now):
+            return sum(not orchestrator._is_rate_limited_local("sess_rl") for _ in range(count))
+
+    def test_window_rollover(self):
+        """The previous window weighs in proportionally, then expires."""
+        orchestrator = IntelligentHybridOrchestrator()
+        limit = orchestrator.max_messages_per_minute
+
+        assert self._allowed(orchestrator, 120.0, limit + 1) == limit
+        # Início da janela seguinte: a anterior ainda pesa 100%
+        assert self._allowed(orchestrator, 180.0, 1) == 0
+        # Metade da janela: a anterior pesa 50%
+        assert self._allowed(orchestrator, 210.0, limit) == limit // 2
+        # Uma janela inteira sem mensagens: contagem zerada
+        assert self._allowed(orchestrator, 300.0, limit + 1) == limit
+
+
+class TestGeminiBreaker:
+    """Process-wide Gemini circuit breaker transitions."""
+
+    def test_open_half_open_close(self):
+        orchestrator = IntelligentHybridOrchestrator()
+        breaker = orchestrator._gemini_breaker
+
+        for _ in range(breaker["threshold"]):
+            assert not orchestrator._gemini_breaker_open()
+            orchestrator._record_gemini_failure()
+        assert orchestrator._gemini_breaker_open()
+        assert orchestrator.gemini_available is False
+
+        # Cooldown vencido: meio-aberto, uma nova tentativa é liberada
+        breaker["opened_at"] -= breaker["cooldown"] + 1
+        assert not orchestrator._gemini_breaker_open()
+
+        # Tentativa falhou: reabre por mais um cooldown
+        orchestrator._record_gemini_failure()
+        assert orchestrator._gemini_breaker_open()
+
+        # Nova tentativa após o cooldown dá certo: fecha
+        breaker["opened_at"] -= breaker["cooldown"] + 1
+        orchestrator._record_gemini_success()
+        assert not orchestrator._gemini_breaker_open()
+        assert orchestrator.gemini_available is True
+        assert breaker["failures"] == 0
+
+
+class TestContextCaches:
+    """Session context and overall status memoization."""
+
+    @pytest.mark.asyncio
+    async def test_session_write_invalidates_context(self):
+        """A confirmed write drops the memoized context; the next read hits the store."""
+        orchestrator = IntelligentHybridOrchestrator()
+        mock_get = AsyncMock(return_value={**make_session("sess_ctx"), "flow_completed": False, "phone_submitted": False})
+
+        with patch('app.services.orchestration_service.get_user_session', new=mock_get), \
+             patch('app.services.orchestration_service.save_user_session', new=AsyncMock(return_value=True)):
+            first = await orchestrator.get_session_context("sess_ctx")
+            assert await orchestrator.get_session_context("sess_ctx") is first
+            assert mock_get.await_count == 1
+
+            orchestrator._schedule_session_save("sess_ctx", make_session("sess_ctx", step=2), "cid")
+            await orchestrator._pending_saves["sess_ctx"]
+            await orchestrator.get_session_context("sess_ctx")
+
+        assert mock_get.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_status_cache_and_forced_refresh(self):
+        """Within the TTL the status is reused; use_cache=False rebuilds it."""
+        orchestrator = IntelligentHybridOrchestrator()
+        first = await orchestrator.get_overall_service_status()
+
+        orchestrator.gemini_available = False
+        assert (await orchestrator.get_overall_service_status()) is first
+
+        refreshed = await orchestrator.get_overall_service_status(use_cache=False)
+        assert refreshed["gemini_available"] is False
+        assert refreshed["ai_status"] == "quota_exceeded"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,40 @@
+"""
+Unit tests for phone normalization helpers.
+"""
+
+import pytest
+from app.utils.phone import digits_only, normalize_br_phone
+
+
+class TestDigitsOnly:
+    """Test the str.translate based digit stripping."""
+
+    def test_strips_formatting(self):
+        """Formatting characters are removed."""
+        assert digits_only("+55 (11) 99999-9999") == "5511999999999"
+
+    def test_strips_non_ascii(self):
+        """Emojis and other non-ASCII characters are removed."""
+        assert digits_only("📱 11 99999 9999") == "11999999999"
+
+    def test_empty_and_digits(self):
+        """Empty strings and plain digits are returned unchanged."""
+        assert digits_only("") == ""
+        assert digits_only("5511999999999") == "5511999999999"
+
+
+class TestNormalizeBrPhone:
+    """Test Brazilian phone normalization."""
+
+    def test_adds_country_code(self):
+        """Numbers without 55 get the prefix."""
+        assert normalize_br_phone("(11) 99999-9999") == "5511999999999"
+
+    def test_keeps_normalized_number(self):
+        """Already normalized numbers are returned unchanged."""
+        assert normalize_br_phone("5511999999999") == "5511999999999"
+        assert normalize_br_phone("+55 11 99999-9999") == "5511999999999"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,145 @@
+"""
+Unit tests for the WhatsApp routes: webhook dedup, the authorization cache
+and request validation.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import whatsapp
+from app.routes.whatsapp import router, is_session_authorized
+
+SESSION_ID = "whatsapp_abc123_def456"
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    return app
+
+
+@pytest.fixture
+def client():
+    return TestClient(make_app())
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    whatsapp._seen_messages.clear()
+    whatsapp._auth_cache.clear()
+    yield
+    whatsapp._seen_messages.clear()
+    whatsapp._auth_cache.clear()
+
+
+def webhook_payload(message_id: str = "MSG1") -> dict:
+    return {"message": f"Olá {SESSION_ID}", "from": "5511999999999@s.whatsapp.net", "messageId": message_id}
+
+
+class TestWebhookDedup:
+    """Redelivered messageIds reuse the first response."""
+
+    def test_replay_returns_cached_response(self, client):
+        """The second delivery is answered from the LRU without reprocessing."""
+        auth = {"expires_at_epoch": 2 ** 40}
+        with patch.object(whatsapp, "get_user_session", new=AsyncMock(return_value=auth)) as mock_get, \
+             patch.object(whatsapp, "_process_and_send", new=AsyncMock()) as mock_process:
+            first = client.post("/api/v1/whatsapp/webhook", json=webhook_payload())
+            whatsapp._auth_cache.clear()  # força nova leitura se a mensagem fosse reprocessada
+            second = client.post("/api/v1/whatsapp/webhook", json=webhook_payload())
+
+        assert first.json()["status"] == "accepted"
+        assert second.json() == first.json()
+        assert mock_get.await_count == 1
+        assert mock_process.await_count == 1
+
+    def test_new_message_id_is_processed(self, client):
+        """A different messageId is not treated as a redelivery."""
+        auth = {"expires_at_epoch": 2 ** 40}
+        with patch.object(whatsapp, "get_user_session", new=AsyncMock(return_value=auth)), \
+             patch.object(whatsapp, "_process_and_send", new=AsyncMock()) as mock_process:
+            client.post("/api/v1/whatsapp/webhook", json=webhook_payload("MSG1"))
+            client.post("/api/v1/whatsapp/webhook", json=webhook_payload("MSG2"))
+
+        assert mock_process.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_redelivery_processed_once(self):
+        """Two deliveries racing through the authorization read schedule one job."""
+        async def slow_auth(_key):
+            await asyncio.sleep(0.05)
+            return {"expires_at_epoch": 2 ** 40}
+
+        with patch.object(whatsapp, "get_user_session", new=slow_auth), \
+             patch.object(whatsapp, "_process_and_send", new=AsyncMock()) as mock_process:
+            async with httpx.AsyncClient(app=make_app(), base_url="http://test") as client:
+                first, second = await asyncio.gather(
+                    client.post("/api/v1/whatsapp/webhook", json=webhook_payload()),
+                    client.post("/api/v1/whatsapp/webhook", json=webhook_payload()),
+                )
+
+        assert mock_process.await_count == 1
+        assert sorted(r.json()["status"] for r in (first, second)) == ["accepted", "processing"]
+
+    @pytest.mark.asyncio
+    async def test_reservation_released_on_error(self):
+        """An error before the decision lets a redelivery be processed again."""
+        with patch.object(whatsapp, "is_session_authorized", new=AsyncMock(side_effect=RuntimeError("boom"))):
+            async with httpx.AsyncClient(app=make_app(), base_url="http://test") as client:
+                response = await client.post("/api/v1/whatsapp/webhook", json=webhook_payload())
+
+        assert response.json()["status"] == "error"
+        assert "MSG1" not in whatsapp._seen_messages
+
+    def test_lru_is_bounded(self):
+        """The oldest messageId is evicted past SEEN_MESSAGES_MAX."""
+        with patch.object(whatsapp, "SEEN_MESSAGES_MAX", 2):
+            for message_id in ("a", "b", "c"):
+                whatsapp.remember_webhook_response(message_id, {"status": "ignored"})
+
+        assert list(whatsapp._seen_messages) == ["b", "c"]
+
+
+class TestAuthorizationCache:
+    """Authorizations are read from Firebase once per TTL, expiry checked every time."""
+
+    @pytest.mark.asyncio
+    async def test_cached_authorization_skips_firebase(self):
+        """A second check for the same session does not read Firebase again."""
+        auth = {"expires_at_epoch": 2 ** 40}
+        with patch.object(whatsapp, "get_user_session", new=AsyncMock(return_value=auth)) as mock_get:
+            assert (await is_session_authorized(SESSION_ID))["authorized"]
+            assert (await is_session_authorized(SESSION_ID))["authorized"]
+
+        assert mock_get.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_authorization_still_expires(self):
+        """A cached authorization past expires_at_epoch is rejected."""
+        whatsapp._auth_cache[SESSION_ID] = {"expires_at_epoch": 0}
+        with patch.object(whatsapp, "get_user_session", new=AsyncMock()) as mock_get:
+            result = await is_session_authorized(SESSION_ID)
+
+        assert result == {"authorized": False, "action": "IGNORE_COMPLETELY", "reason": "session_expired"}
+        mock_get.assert_not_awaited()
+
+
+
+class TestAuthorizeValidation:
+    """The hand-validated authorize body keeps FastAPI's 422 format."""
+
+    def test_missing_field_loc_has_body_prefix(self, client):
+        response = client.post("/api/v1/whatsapp/authorize", json={"phone_number": "11999999999"})
+
+        assert response.status_code == 422
+        locs = [err["loc"] for err in response.json()["detail"]]
+        assert locs == [["body", "session_id"]]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,20 @@
+"""
+Log Context Utilities
+
+Correlation ID por requisição guardado em um ContextVar. O filtro copia o
+valor para cada LogRecord, então as mensagens não precisam repetir o prefixo
+e tasks criadas durante a requisição herdam o mesmo ID automaticamente.
+"""
+
+import logging
+from contextvars import ContextVar
+
+correlation_id_var: ContextVar[str] = ContextVar("correlation_id", default="-")
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Adiciona record.correlation_id a partir do contexto atual."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id_var.get()
+        return True
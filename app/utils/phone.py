@@ -0,0 +1,36 @@
+"""
+Phone Utilities
+
+Helpers de normalização de números de telefone compartilhados entre rotas
+e serviços. A limpeza usa str.translate com uma tabela pré-computada, que
+roda em uma única passada em C, sem regex nem callbacks por caractere.
+"""
+
+
+class _DigitsOnlyTable(dict):
+    """Tabela para str.translate que mantém apenas os dígitos ASCII (0-9)."""
+
+    def __missing__(self, codepoint: int):
+        value = codepoint if 48 <= codepoint <= 57 else None
+        self[codepoint] = value
+        return value
+
+
+_DIGITS_ONLY = _DigitsOnlyTable()
+
+
+def digits_only(text: str) -> str:
+    """Remove todos os caracteres que não são dígitos."""
+    return text.translate(_DIGITS_ONLY)
+
+
+BR_PREFIX = "55"
+
+
+def normalize_br_phone(text: str) -> str:
+    """Deixa só os dígitos e garante o código do Brasil (55) no início."""
+    # Caminho rápido: número já normalizado (isascii evita dígitos não ASCII)
+    if text.isascii() and text.isdigit() and text[:2] == BR_PREFIX:
+        return text
+    clean = digits_only(text)
+    return clean if clean[:2] == BR_PREFIX else BR_PREFIX + clean